@@ -0,0 +1,838 @@
+#!/usr/bin/env python
+
+#
+# benchmark.py
+#
+# Benchmarks for font-awesome-to-png.py.
+#
+# Copyright (c) 2012-2014 Michal Wojciechowski (http://odyniec.net/)
+#
+
+import sys, io, argparse, gc, resource, time, subprocess, shutil, tempfile
+import math, struct, random, json, hashlib, platform, os
+from os import path
+
+from PIL import Image, ImageDraw
+
+import font_awesome_to_png as fa
+
+SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+        "font-awesome-to-png.py")
+
+SIZES = [16, 32, 64, 128, 256, 512, 1024]
+
+# Icon counts of the suite; None stands for all icons
+COUNTS = [1, 50, None]
+
+# Output modes of the suite, as extra command line arguments
+MODES = [
+    ("files", []),
+    ("no-mask-store", ["--mask-cache-size", "0"]),
+    ("jobs", ["--jobs", "4"]),
+    ("encode-threads", ["--encode-threads", "2"]),
+    ("fsync-batch", ["--fsync-batch", "64"]),
+    ("reduce-colors", ["--reduce-colors"]),
+    ("sprite", ["--sprite", "sprite.png"]),
+    ("zip", ["--archive", "icons.zip"]),
+    ("tar.gz", ["--archive", "icons.tar.gz"]),
+    ("svg", ["--format", "svg"]),
+]
+
+RESULTS_VERSION = 1
+
+# Sizes and factor of the supersampling check, the scale of its reference
+# images, and the largest mean edge error (in pixels) and shift of the
+# bounding box it allows
+SUPERSAMPLE_SIZES = [16, 32, 64, 128]
+SUPERSAMPLE_FACTOR = 2
+REFERENCE_SCALE = 8
+MAX_EDGE_ERROR = 0.2
+MAX_BBOX_SHIFT = 2
+
+# Icon size and --max-memory of the memory ceiling check
+MEMORY_SIZE = 2048
+MEMORY_LIMIT = 64
+
+
+# Metrics of the generated test font, the same as Font Awesome's
+UNITS_PER_EM = 1792
+ASCENT = 1536
+DESCENT = -256
+
+
+def _checksum(data):
+    """Returns the checksum of a font table."""
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(">%iI" % (len(data) // 4), data)) & 0xFFFFFFFF
+
+
+def _polygon(cx, cy, radius, sides, rotation, clockwise=True):
+    """Returns the points of a regular polygon."""
+    step = -2 * math.pi / sides if clockwise else 2 * math.pi / sides
+    return [(int(round(cx + radius * math.cos(rotation + i * step))),
+            int(round(cy + radius * math.sin(rotation + i * step))))
+            for i in range(sides)]
+
+
+def _test_glyph(codepoint):
+    """Returns the contours of the test font's glyph of a codepoint: a few
+    polygons, and sometimes a frame, placed pseudo-randomly but the same way
+    on every run."""
+    rng = random.Random(codepoint)
+    contours = []
+    if rng.random() < 0.5:
+        # A frame: an outer square with a square hole
+        margin = rng.randint(100, 300)
+        width = rng.randint(120, 250)
+        lo, hi = margin, UNITS_PER_EM - margin
+        bottom, top = DESCENT + margin, ASCENT - margin
+        contours.append([(lo, bottom), (lo, top), (hi, top), (hi, bottom)])
+        contours.append([(lo + width, bottom + width),
+                (hi - width, bottom + width), (hi - width, top - width),
+                (lo + width, top - width)])
+    for i in range(rng.randint(1, 4)):
+        radius = rng.randint(150, 600)
+        cx = rng.randint(radius, UNITS_PER_EM - radius)
+        cy = rng.randint(DESCENT + radius, ASCENT - radius)
+        contours.append(_polygon(cx, cy, radius, rng.randint(3, 8),
+                rng.random() * math.pi))
+    return contours
+
+
+def _encode_glyph(contours):
+    """Encodes a glyph as a glyf table entry.
+
+    Returns a (data, bounding box, number of points) tuple.
+    """
+    points = [point for contour in contours for point in contour]
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    data = struct.pack(">hhhhh", len(contours), min(xs), min(ys), max(xs),
+            max(ys))
+    end = -1
+    for contour in contours:
+        end += len(contour)
+        data += struct.pack(">H", end)
+    data += struct.pack(">H", 0)
+    # All points are on the curve, with 16-bit coordinates
+    data += b"\x01" * len(points)
+    last = 0
+    for x in xs:
+        data += struct.pack(">h", x - last)
+        last = x
+    last = 0
+    for y in ys:
+        data += struct.pack(">h", y - last)
+        last = y
+    bbox = (min(xs), min(ys), max(xs), max(ys))
+    return data + b"\0" * (-len(data) % 4), bbox, len(points)
+
+
+def write_test_font(filename, codepoints):
+    """Writes a TrueType font with a glyph for each of the codepoints, so
+    the benchmarks don't need to download Font Awesome. The font is the same
+    on every run, byte for byte."""
+    codepoints = sorted(set(codepoints))
+    glyphs = [(b"", None, 0)] + [_encode_glyph(_test_glyph(code))
+            for code in codepoints]
+    num_glyphs = len(glyphs)
+    bboxes = [bbox for data, bbox, npoints in glyphs if bbox]
+
+    glyf = b"".join(data for data, bbox, npoints in glyphs)
+    offsets = [0]
+    for data, bbox, npoints in glyphs:
+        offsets.append(offsets[-1] + len(data))
+    loca = struct.pack(">%iI" % len(offsets), *offsets)
+
+    xmin = min(b[0] for b in bboxes)
+    ymin = min(b[1] for b in bboxes)
+    xmax = max(b[2] for b in bboxes)
+    ymax = max(b[3] for b in bboxes)
+
+    head = struct.pack(">IIIIHHqqhhhhHHhhh", 0x00010000, 0x00010000, 0,
+            0x5F0F3CF5, 0x000B, UNITS_PER_EM, 0, 0, xmin, ymin, xmax, ymax,
+            0, 8, 2, 1, 0)
+    hhea = struct.pack(">IhhhHhhhhhh4hhH", 0x00010000, ASCENT, DESCENT, 0,
+            UNITS_PER_EM, 0, 0, xmax, 1, 0, 0, 0, 0, 0, 0, 0, num_glyphs)
+    hmtx = b"".join(struct.pack(">Hh", UNITS_PER_EM, bbox[0] if bbox else 0)
+            for data, bbox, npoints in glyphs)
+    maxp = struct.pack(">IHHHHHHHHHHHHHH", 0x00010000, num_glyphs,
+            max(npoints for data, bbox, npoints in glyphs),
+            max(len(_test_glyph(code)) for code in codepoints), 0, 0, 2, 0, 0,
+            0, 0, 0, 0, 0, 0)
+
+    # Format 4 cmap: one segment per run of consecutive codepoints, which
+    # map to consecutive glyphs
+    segments = []
+    for glyph, code in enumerate(codepoints, 1):
+        if segments and segments[-1][1] == code - 1:
+            segments[-1][1] = code
+        else:
+            segments.append([code, code, (glyph - code) % 0x10000])
+    segments.append([0xFFFF, 0xFFFF, 1])
+    count = len(segments)
+    search = 2 ** int(math.log(count, 2))
+    subtable = struct.pack(">HHHH", count * 2, search * 2,
+            int(math.log(search, 2)), count * 2 - search * 2)
+    subtable += struct.pack(">%iH" % count, *[s[1] for s in segments])
+    subtable += struct.pack(">H", 0)
+    subtable += struct.pack(">%iH" % count, *[s[0] for s in segments])
+    subtable += struct.pack(">%iH" % count, *[s[2] for s in segments])
+    subtable += struct.pack(">%iH" % count, *([0] * count))
+    subtable = struct.pack(">HHH", 4, len(subtable) + 6, 0) + subtable
+    cmap = struct.pack(">HHHHI", 0, 1, 3, 1, 12) + subtable
+
+    strings = [(1, u"Benchmark Icons"), (2, u"Regular"),
+            (4, u"Benchmark Icons Regular"), (6, u"BenchmarkIcons-Regular")]
+    records = b""
+    storage = b""
+    for name_id, string in strings:
+        encoded = string.encode("utf-16-be")
+        records += struct.pack(">HHHHHH", 3, 1, 0x409, name_id, len(encoded),
+                len(storage))
+        storage += encoded
+    name = struct.pack(">HHH", 0, len(strings), 6 + len(records)) + records \
+            + storage
+
+    post = struct.pack(">IIhhIIIII", 0x00030000, 0, -100, 50, 0, 0, 0, 0, 0)
+
+    tables = sorted({b"cmap": cmap, b"glyf": glyf, b"head": head,
+            b"hhea": hhea, b"hmtx": hmtx, b"loca": loca, b"maxp": maxp,
+            b"name": name, b"post": post}.items())
+
+    search = 2 ** int(math.log(len(tables), 2))
+    directory = struct.pack(">IHHHH", 0x00010000, len(tables), search * 16,
+            int(math.log(search, 2)), len(tables) * 16 - search * 16)
+    offset = len(directory) + 16 * len(tables)
+    body = b""
+    for tag, data in tables:
+        directory += struct.pack(">4sIII", tag, _checksum(data),
+                offset + len(body), len(data))
+        body += data + b"\0" * (-len(data) % 4)
+
+    font = directory + body
+    # Set the whole font checksum adjustment in the head table
+    adjustment = (0xB1B0AFBA - _checksum(font)) & 0xFFFFFFFF
+    position = offset + body.index(head) + 8
+    font = font[:position] + struct.pack(">I", adjustment) + \
+            font[position + 4:]
+
+    with open(filename, "wb") as f:
+        f.write(font)
+
+
+def write_test_css(filename, icon_map):
+    """Writes a CSS file defining the icons of an icon map the way
+    font-awesome.css does."""
+    with open(filename, "w") as f:
+        f.write(".fa {\n  display: inline-block;\n  font-family: FontAwesome;"
+                "\n}\n@media print {\n  .fa { color: black; }\n}\n")
+        for name, char in sorted(icon_map.items()):
+            f.write(".fa-%s:before {\n  content: \"\\%x\";\n}\n"
+                    % (name, ord(char)))
+
+
+def render_icon_twopass(icon, size, font, color):
+    """The original renderer, which draws each icon twice and allocates four
+    full-size canvases. Kept as a baseline for comparisons."""
+    image = Image.new("RGBA", (size, size), color=(0,0,0,0))
+    draw = ImageDraw.Draw(image)
+    font = fa.font_cache.load(font, size)
+    char = fa.load_icons()[icon]
+    width,height = fa.text_size(font, char)
+    draw.text(((size - width) / 2, (size - height) / 2), char,
+            font=font, fill=color)
+    bbox = image.getbbox()
+    imagemask = Image.new("L", (size, size), 0)
+    drawmask = ImageDraw.Draw(imagemask)
+    drawmask.text(((size - width) / 2, (size - height) / 2), char,
+        font=font, fill=255)
+    iconimage = Image.new("RGBA", (size,size), color)
+    iconimage.putalpha(imagemask)
+    if bbox:
+        iconimage = iconimage.crop(bbox)
+    borderw = int((size - (bbox[2] - bbox[0])) / 2)
+    borderh = int((size - (bbox[3] - bbox[1])) / 2)
+    outimage = Image.new("RGBA", (size, size), (0,0,0,0))
+    outimage.paste(iconimage, (borderw,borderh))
+    return outimage
+
+
+RENDERERS = {
+    "two-pass": render_icon_twopass,
+    "single-pass": lambda *args: fa.render_icon(*args),
+}
+
+
+def max_rss():
+    """Returns the peak resident set size of this process, in kilobytes."""
+    try:
+        # On Linux, ru_maxrss survives exec() and so includes the peak of
+        # the parent process -- VmHWM doesn't
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def measure_render(renderer, icons, size, font, color):
+    """Measures the time per icon and the peak memory growth of a renderer.
+
+    Returns a (seconds per icon, kilobytes) tuple.
+    """
+    render = RENDERERS[renderer]
+
+    # Load the font up front, so it isn't counted in the measurements
+    fa.font_cache.load(font, size)
+    gc.collect()
+    rss_before = max_rss()
+
+    start = time.time()
+    for icon in icons:
+        render(icon, size, font, color)
+    elapsed = time.time() - start
+
+    return elapsed / len(icons), max_rss() - rss_before
+
+
+def measure_render_subprocess(renderer, count, size, font, color):
+    """Runs measure_render in a fresh process, so the peak memory usage of
+    one measurement doesn't hide the peak of another."""
+    output = subprocess.check_output([sys.executable, __file__,
+            "--measure", renderer, "--count", str(count), "--size", str(size),
+            "--font", font, "--color", color])
+    elapsed, rss = output.split()
+    return float(elapsed), int(rss)
+
+
+def peak_rss(args):
+    """Runs font-awesome-to-png.py with the given arguments, in an empty
+    output directory and with an empty cache, and returns the peak resident
+    set size of the process in megabytes."""
+    outdir = tempfile.mkdtemp()
+    env = dict(os.environ, FONT_AWESOME_TO_PNG_CACHE_DIR=path.join(outdir,
+            "cache"))
+    try:
+        with open(path.devnull, "w") as devnull:
+            process = subprocess.Popen([sys.executable, SCRIPT] + args,
+                    stdout=devnull, cwd=outdir, env=env)
+            # The resource usage of just this process
+            pid, status, usage = os.wait4(process.pid, 0)
+    finally:
+        shutil.rmtree(outdir)
+
+    if status:
+        raise subprocess.CalledProcessError(status, SCRIPT)
+    rss = usage.ru_maxrss // 1024
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def check_memory(font, icons, size, max_memory, ceiling=None):
+    """Exports icons with --max-memory in a separate process, and checks
+    that the peak resident set size of the process stays under ceiling
+    (in megabytes). Returns True if it does.
+
+    By default, the ceiling is what --max-memory allows for: the peak of
+    exporting the icons at 16x16 pixels (Python, Pillow and the font), plus
+    max_memory, plus the buffers of the glyph being rasterized (4 x size x
+    size bytes), plus a tenth of max_memory for the memory allocator.
+    """
+    font = path.abspath(font)
+    if ceiling is None:
+        ceiling = peak_rss(["--font", font, "--size", "16"] + icons) + \
+                max_memory * 11 // 10 + 4 * size * size // (1024 * 1024)
+
+    rss = peak_rss(["--font", font, "--size", str(size), "--max-memory",
+            str(max_memory)] + icons)
+
+    passed = rss <= ceiling
+    print("Peak RSS exporting %i icons at %ix%i pixels with --max-memory %i: "
+            "%i MB (ceiling: %i MB, %s)" % (len(icons), size, size,
+            max_memory, rss, ceiling, "ok" if passed else "exceeded"))
+    return passed
+
+
+def bench_render(icons, sizes, font, color):
+    """Compares the single-pass renderer against the original two-pass one."""
+    for icon in icons:
+        for size in sizes:
+            old = render_icon_twopass(icon, size, font, color).tobytes()
+            new = fa.render_icon(icon, size, font, color).tobytes()
+            if old != new:
+                print("Warning: output of \"%s\" at %ipx differs" % (icon, size))
+
+    print("%6s  %12s  %12s  %12s  %12s" % ("size", "two-pass ms",
+            "single ms", "two-pass KB", "single KB"))
+
+    for size in sizes:
+        old_time, old_rss = measure_render_subprocess("two-pass", len(icons),
+                size, font, color)
+        new_time, new_rss = measure_render_subprocess("single-pass",
+                len(icons), size, font, color)
+        print("%6i  %12.3f  %12.3f  %12i  %12i" % (size, old_time * 1000,
+                new_time * 1000, old_rss, new_rss))
+
+
+def alpha_difference(image1, image2):
+    """Returns the mean and maximum absolute difference between the alpha
+    channels of two images, and their PSNR in decibels."""
+    alpha1 = bytearray(image1.split()[3].tobytes())
+    alpha2 = bytearray(image2.split()[3].tobytes())
+    diffs = [abs(a - b) for a, b in zip(alpha1, alpha2)]
+    mse = sum(d * d for d in diffs) / float(len(diffs))
+    psnr = 10 * math.log10(255 ** 2 / mse) if mse else float("inf")
+    return sum(diffs) / float(len(diffs)), max(diffs), psnr
+
+
+def bench_supersample(icons, sizes, font, color, factor):
+    """Compares rasterizing each size directly against downscaling from a
+    single rasterization at the largest size times factor."""
+    base = int(round(max(sizes) * factor))
+    direct = fa.Exporter(font)
+    supersampled = fa.Exporter(font, supersample_size=base)
+
+    timings = []
+    for exporter in (direct, supersampled):
+        for size in sizes + [base]:
+            exporter.font_cache.load(font, size)
+        start = time.time()
+        for icon in icons:
+            for size in sizes:
+                exporter.render(icon, size, color)
+        timings.append((time.time() - start) / len(icons))
+
+    print("Time per icon for all %i sizes: direct %.3f ms, "
+            "supersampled from %ipx %.3f ms" % (len(sizes),
+            timings[0] * 1000, base, timings[1] * 1000))
+
+    print("%6s  %12s  %12s  %12s" % ("size", "mean diff", "max diff",
+            "PSNR dB"))
+    for size in sizes:
+        results = [alpha_difference(direct.render(icon, size, color),
+                supersampled.render(icon, size, color)) for icon in icons]
+        print("%6i  %12.3f  %12i  %12.1f" % (size,
+                sum(r[0] for r in results) / len(results),
+                max(r[1] for r in results),
+                min(r[2] for r in results)))
+
+
+def coverage_error(alpha, reference):
+    """Returns the mean error of the edges of an alpha mask against a
+    reference, in pixels, estimated from the difference of their coverage:
+    for a glyph filling a size x size square, moving its outline by one
+    pixel changes its coverage by about 4 / size."""
+    from PIL import ImageStat
+    coverage = ImageStat.Stat(alpha).sum[0]
+    expected = ImageStat.Stat(reference).sum[0]
+    return abs(coverage - expected) / max(expected, 1) * alpha.size[0] / 4
+
+
+def bbox_shift(alpha, reference):
+    """Returns the largest difference between the bounding boxes of the
+    pixels of two alpha masks which are at least half opaque."""
+    def bbox(image):
+        return image.point(lambda level: 255 if level >= 128 else 0).getbbox()
+    boxes = bbox(alpha), bbox(reference)
+    if None in boxes:
+        return 0 if boxes[0] == boxes[1] else alpha.size[0]
+    return max(abs(a - b) for a, b in zip(*boxes))
+
+
+def check_supersample(font, icons, sizes=SUPERSAMPLE_SIZES,
+        factor=SUPERSAMPLE_FACTOR):
+    """Checks the icons downscaled from a single rasterization at the largest
+    size times factor against references rasterized at REFERENCE_SCALE
+    times each size and reduced by averaging. At each size, the mean edge
+    error (see coverage_error) must stay under MAX_EDGE_ERROR, and no
+    bounding box may be off by more than MAX_BBOX_SHIFT pixels. Directly
+    rasterized icons are measured too, for comparison. Returns True if the
+    check passes."""
+    base = int(round(max(sizes) * factor))
+    direct = fa.Exporter(font)
+    supersampled = fa.Exporter(font, supersample_size=base)
+
+    passed = True
+    print("%6s  %12s  %12s  %10s" % ("size", "direct px", "supersample px",
+            "bbox px"))
+    for size in sizes:
+        errors = [0.0, 0.0]
+        shift = 0
+        for icon in icons:
+            reference = direct.render(icon, size * REFERENCE_SCALE,
+                    "black").split()[3].resize((size, size), Image.BOX)
+            alphas = [exporter.render(icon, size, "black").split()[3]
+                    for exporter in (direct, supersampled)]
+            for i, alpha in enumerate(alphas):
+                errors[i] += coverage_error(alpha, reference) / len(icons)
+            shift = max(shift, bbox_shift(alphas[1], reference))
+
+        ok = errors[1] < MAX_EDGE_ERROR and shift <= MAX_BBOX_SHIFT
+        passed = passed and ok
+        print("%6i  %12.3f  %14.3f  %10i  %s" % (size, errors[0], errors[1],
+                shift, "ok" if ok else "failed"))
+    print("Supersampling from %ipx: %s (edge error limit: %.2f px, bounding "
+            "box limit: %i px)" % (base, "ok" if passed else "failed",
+            MAX_EDGE_ERROR, MAX_BBOX_SHIFT))
+    return passed
+
+
+def time_command(args, repeat, cwd=None, cache="warm"):
+    """Runs font-awesome-to-png.py with the given arguments and returns the
+    best and median wall time of the runs.
+
+    The runs get a cache directory of their own, never the user's: with
+    cache "cold", it's emptied before every run, with "warm", it's filled by
+    a run which isn't timed.
+    """
+    cache_dir = tempfile.mkdtemp()
+    env = dict(os.environ, FONT_AWESOME_TO_PNG_CACHE_DIR=cache_dir)
+    times = []
+    try:
+        with open(path.devnull, "w") as devnull:
+            if cache == "warm":
+                subprocess.check_call([sys.executable, SCRIPT] + args,
+                        stdout=devnull, cwd=cwd, env=env)
+            for i in range(repeat):
+                if cache == "cold":
+                    shutil.rmtree(cache_dir)
+                    os.mkdir(cache_dir)
+                start = time.time()
+                subprocess.check_call([sys.executable, SCRIPT] + args,
+                        stdout=devnull, cwd=cwd, env=env)
+                times.append(time.time() - start)
+    finally:
+        shutil.rmtree(cache_dir)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def bench_startup(font, repeat, results=None, cache="warm"):
+    """Measures the wall time of whole runs of the script, including the
+    interpreter startup, with a cold or warm cache (see time_command). The
+    best times are stored in results, if given."""
+    font = path.abspath(font)
+    outdir = tempfile.mkdtemp()
+
+    try:
+        print("%-20s  %10s  %10s  (%s cache)" % ("command", "best ms",
+                "median ms", cache))
+        for name, args in [
+                ("--list", ["--list"]),
+                ("single icon", ["--font", font, "adjust"]),
+                ("ALL", ["--font", font, "ALL"])]:
+            best, median = time_command(args, repeat, outdir, cache)
+            print("%-20s  %10.1f  %10.1f" % (name, best * 1000, median * 1000))
+            if results is not None:
+                results["startup/%s" % name.replace(" ", "-")] = best
+    finally:
+        shutil.rmtree(outdir)
+
+
+def count_name(count):
+    return "ALL" if count is None else str(count)
+
+
+def bench_stages(font, icons, sizes, counts, color, results):
+    """Times each stage of exporting icons separately: loading the font,
+    rasterizing the masks, compositing the images and encoding them as PNG.
+
+    Stores the time per icon (or per font load) in results.
+    """
+    # Warm up, so the first measurement doesn't include lazy imports
+    fa.Exporter(font).render_bytes(icons[0], 16, color)
+
+    print("%6s  %6s  %10s  %12s  %12s  %10s" % ("size", "count", "font ms",
+            "rasterize ms", "composite ms", "encode ms"))
+
+    for size in sizes:
+        for count in counts:
+            names = icons[:count]
+            exporter = fa.Exporter(font, fonts=fa.FontCache(),
+                    masks=fa.LRUCache(maxsize=1))
+
+            start = time.time()
+            exporter.font_cache.load(font, size)
+            timings = [time.time() - start, 0, 0, 0]
+
+            # Each icon goes through all the stages before the next one, so
+            # only one mask and image are kept at a time, however large. The
+            # mask of one stage is the input of the next through the cache
+            for icon in names:
+                start = time.time()
+                exporter.render_mask(icon, size)
+                rasterized = time.time()
+                image = exporter.render(icon, size, color)
+                composited = time.time()
+                exporter.encode(image, color)
+                timings[1] += rasterized - start
+                timings[2] += composited - rasterized
+                timings[3] += time.time() - composited
+                del image
+            timings[1:] = [seconds / len(names) for seconds in timings[1:]]
+
+            for stage, seconds in zip(["font", "rasterize", "composite",
+                    "encode"], timings):
+                results["stage/%s/%i/%s" % (stage, size,
+                        count_name(count))] = seconds
+            print("%6i  %6s  %10.3f  %12.3f  %12.3f  %10.3f" % ((size,
+                    count_name(count)) + tuple(t * 1000 for t in timings)))
+
+
+def bench_modes(font, icons, size, counts, repeat, results, cache="warm"):
+    """Times whole runs of the script in each output mode (see MODES), with
+    a cold or warm cache (see time_command)."""
+    font = path.abspath(font)
+
+    print("%-14s  %6s  %10s  %10s  (%s cache)" % ("mode", "count",
+            "best ms", "median ms", cache))
+    for mode, mode_args in MODES:
+        for count in counts:
+            args = ["--font", font, "--size", str(size)] + mode_args + \
+                    (["ALL"] if count is None else icons[:count])
+            outdir = tempfile.mkdtemp()
+            try:
+                best, median = time_command(args, repeat, outdir, cache)
+            finally:
+                shutil.rmtree(outdir)
+            results["mode/%s/%s" % (mode, count_name(count))] = best
+            print("%-14s  %6s  %10.1f  %10.1f" % (mode, count_name(count),
+                    best * 1000, median * 1000))
+
+
+def bench_css(css, repeat, results):
+    """Times parsing a CSS file with each of the parsers."""
+    parsers = [("stream", lambda: fa.LoadCSSAction._parse_css_stream(
+            io.open(css, encoding="utf-8")))]
+    try:
+        import tinycss
+    except ImportError:
+        print("tinycss isn't installed, skipping its CSS parser")
+    else:
+        parsers.append(("tinycss", lambda: fa.LoadCSSAction._parse_css_tinycss(
+                io.open(css, encoding="utf-8").read())))
+
+    print("%-14s  %10s  %6s" % ("CSS parser", "best ms", "icons"))
+    for name, parse in parsers:
+        times = []
+        for i in range(repeat):
+            start = time.time()
+            icon_map = parse()
+            times.append(time.time() - start)
+        results["css/%s" % name] = min(times)
+        print("%-14s  %10.1f  %6i" % (name, min(times) * 1000, len(icon_map)))
+
+
+def bench_suite(font, css, icons, sizes, counts, color, repeat,
+        cache="warm"):
+    """Runs all the benchmarks of the suite and returns their results, as a
+    dictionary of benchmark names and times in seconds. Whole runs of the
+    script are timed with a cold or warm cache (see time_command)."""
+    results = {}
+    bench_stages(font, icons, sizes, counts, color, results)
+    print("")
+    bench_modes(font, icons, 32, counts, repeat, results, cache)
+    print("")
+    bench_css(css, repeat, results)
+    print("")
+    bench_startup(font, repeat, results, cache)
+    return results
+
+
+def describe_results(results, font, cache="warm"):
+    """Adds a description of the environment the results of a suite run
+    come from, and the state of the cache in whole runs."""
+    from PIL import __version__ as pillow_version
+
+    with open(font, "rb") as f:
+        font_hash = hashlib.sha1(f.read()).hexdigest()
+
+    return {
+        "version": RESULTS_VERSION,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pillow": pillow_version,
+        "platform": platform.platform(),
+        "font": font_hash,
+        "cache": cache,
+        "results": results,
+    }
+
+
+def load_results(filename):
+    with open(filename) as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_VERSION:
+        sys.stderr.write("Error: %s isn't a results file of this version "
+                "of the benchmarks\n" % filename)
+        sys.exit(1)
+    return data
+
+
+def compare_results(old, new, threshold):
+    """Prints the changes between two sets of results. Returns the number of
+    benchmarks which got slower by more than threshold (e.g. 0.1 for 10%)."""
+    if old["font"] != new["font"]:
+        print("Warning: the results are for different fonts")
+    # Results saved before the cache was controlled have no cache key
+    if old.get("cache") != new.get("cache"):
+        print("Warning: the results are for different caches (%s, %s)" %
+                (old.get("cache", "unknown"), new.get("cache", "unknown")))
+    for key in ("python", "pillow", "platform"):
+        if old[key] != new[key]:
+            print("Warning: the results are for different %s versions "
+                    "(%s, %s)" % (key, old[key], new[key]))
+
+    regressions = 0
+    print("%-32s  %10s  %10s  %8s" % ("benchmark", "old ms", "new ms",
+            "change"))
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        old_time, new_time = old["results"][name], new["results"][name]
+        change = new_time / old_time - 1 if old_time else 0
+        mark = ""
+        if change > threshold:
+            mark = "  slower"
+            regressions += 1
+        elif change < -threshold:
+            mark = "  faster"
+        print("%-32s  %10.3f  %10.3f  %+7.1f%%%s" % (name, old_time * 1000,
+                new_time * 1000, change * 100, mark))
+
+    for name in sorted(set(old["results"]) ^ set(new["results"])):
+        print("%-32s  only in the %s results" % (name,
+                "old" if name in old["results"] else "new"))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description="Benchmarks font-awesome-to-png.py.")
+
+    parser.add_argument("--font", type=str,
+            help="Font file to use (default: a generated test font with a " +
+            "glyph for each icon)")
+    parser.add_argument("--color", type=str, default="black",
+            help="Color (HTML color code or name, default: black)")
+    parser.add_argument("--count", type=int, default=50,
+            help="Number of icons to render at each size (default: 50)")
+    parser.add_argument("--size", type=int, action="append",
+            help="Icon size to benchmark, can be given multiple times " +
+            "(default: %s)" % ", ".join(str(size) for size in SIZES))
+    parser.add_argument("--suite", action="store_true",
+            help="Run the whole benchmark suite instead: each stage of " +
+            "exporting at each size and icon count (1, 50 and ALL), " +
+            "whole runs in each output mode, CSS parsing and startup")
+    parser.add_argument("--results", type=str,
+            help="Save the results of --suite as JSON to the given file")
+    parser.add_argument("--compare", type=str, nargs="+",
+            metavar="RESULTS",
+            help="Compare the results of --suite with the given results " +
+            "file, or compare two results files without running anything. " +
+            "Exits with status 1 if a benchmark got slower.")
+    parser.add_argument("--threshold", type=float, default=10,
+            help="Change in percent above which --compare considers a " +
+            "benchmark slower or faster (default: 10)")
+    parser.add_argument("--make-font", type=str, metavar="FILE",
+            help="Write the generated test font to FILE and exit")
+    parser.add_argument("--startup", action="store_true",
+            help="Measure the time of whole runs of the script instead " +
+            "(--list, a single icon and ALL)")
+    parser.add_argument("--supersample", type=float, metavar="FACTOR",
+            help="Compare direct rasterization of each size against " +
+            "downscaling from the largest size times FACTOR instead")
+    parser.add_argument("--check", action="store_true",
+            help="Run the checks instead, which exit with status 1 if one " +
+            "fails: the peak RSS of exporting --count icons at --size " +
+            "(default: %i) with --max-memory, and the quality of " % (
+            MEMORY_SIZE) + "all supersampled icons against " +
+            "high-resolution references")
+    parser.add_argument("--memory-ceiling", type=int, metavar="MB",
+            help="Peak RSS the memory check allows (default: what " +
+            "--max-memory allows for, see README.md)")
+    parser.add_argument("--max-memory", type=int, default=MEMORY_LIMIT,
+            metavar="MB",
+            help="--max-memory of the memory check (default: %i)" %
+            MEMORY_LIMIT)
+    parser.add_argument("--cache", choices=["cold", "warm"], default="warm",
+            help="Cache of the whole runs of --suite and --startup: cold, " +
+            "emptied before every run, or warm, filled by a run which " +
+            "isn't timed (default: warm). The user's own cache is never " +
+            "used.")
+    parser.add_argument("--repeat", type=int, default=5,
+            help="Number of runs for --startup and --suite (default: 5)")
+    parser.add_argument("--measure", choices=sorted(RENDERERS.keys()),
+            help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    codepoints = [ord(char) for char in fa.load_icons().values()]
+
+    if args.make_font:
+        write_test_font(args.make_font, codepoints)
+        sys.exit(0)
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two results files")
+    if args.compare and len(args.compare) == 2:
+        regressions = compare_results(load_results(args.compare[0]),
+                load_results(args.compare[1]), args.threshold / 100)
+        sys.exit(1 if regressions else 0)
+
+    workdir = tempfile.mkdtemp()
+    # The benchmarks in this process don't use the user's cache either
+    os.environ["FONT_AWESOME_TO_PNG_CACHE_DIR"] = path.join(workdir, "cache")
+    if not args.font:
+        args.font = path.join(workdir, "benchmark-icons.ttf")
+        write_test_font(args.font, codepoints)
+
+    icons = sorted(fa.load_icons().keys())[:args.count]
+
+    try:
+        if args.suite:
+            css = path.join(workdir, "benchmark-icons.css")
+            write_test_css(css, fa.load_icons())
+            results = describe_results(bench_suite(args.font, css,
+                    sorted(fa.load_icons().keys()), args.size or SIZES,
+                    COUNTS, args.color, args.repeat, args.cache), args.font,
+                    args.cache)
+            if args.results:
+                with open(args.results, "w") as f:
+                    json.dump(results, f, indent=2, sort_keys=True)
+            if args.compare:
+                print("")
+                if compare_results(load_results(args.compare[0]), results,
+                        args.threshold / 100):
+                    sys.exit(1)
+        elif args.check or args.memory_ceiling:
+            # The memory check goes first: on Linux, the peak RSS of a child
+            # process includes that of this process when it was started
+            passed = check_memory(args.font, icons,
+                    (args.size or [MEMORY_SIZE])[0], args.max_memory,
+                    args.memory_ceiling)
+            if args.check:
+                print("")
+                # All the icons, as the limits are met on average, and a few
+                # icons can be worse
+                if not check_supersample(args.font,
+                        sorted(fa.load_icons().keys())):
+                    passed = False
+            if not passed:
+                sys.exit(1)
+        elif args.startup:
+            bench_startup(args.font, args.repeat, cache=args.cache)
+        elif args.supersample:
+            bench_supersample(icons, args.size or SIZES, args.font,
+                    args.color, args.supersample)
+        elif args.measure:
+            print("%f %i" % measure_render(args.measure, icons, args.size[0],
+                    args.font, args.color))
+        else:
+            bench_render(icons, args.size or SIZES, args.font, args.color)
+    finally:
+        shutil.rmtree(workdir)
@@ -0,0 +1,4503 @@
+#
+# font_awesome_to_png.py
+#
+# Exports Font Awesome icons as PNG images.
+#
+# Copyright (c) 2012-2014 Michal Wojciechowski (http://odyniec.net/)
+#
+# Font Awesome - http://fortawesome.github.com/Font-Awesome
+#
+
+import sys, argparse, re, json, math, hashlib, os, shutil, io
+import threading, time, csv
+from collections import OrderedDict
+from os import path, access, R_OK
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+# Support Unicode literals with both Python 2 and 3
+if sys.version < '3':
+    import codecs
+    def u(x):
+        return codecs.unicode_escape_decode(x)[0]
+
+    def uchr(x):
+        return unichr(x)
+else:
+    def u(x):
+        return x
+
+    def uchr(x):
+        return chr(x)
+
+# Version of the rendering code, part of the key of each rendered icon.
+# Increase it whenever a change makes the output images differ.
+RENDERER_VERSION = 2
+
+# Icon names and character codes, loaded into the icons mapping by
+# load_icons(). Kept as plain text rather than a dict literal, as compiling a
+# large literal adds to the startup time of every run.
+ICON_TABLE = """
+adjust f042
+adn f170
+align-center f037
+align-justify f039
+align-left f036
+align-right f038
+ambulance f0f9
+anchor f13d
+android f17b
+angle-double-down f103
+angle-double-left f100
+angle-double-right f101
+angle-double-up f102
+angle-down f107
+angle-left f104
+angle-right f105
+angle-up f106
+apple f179
+archive f187
+arrow-circle-down f0ab
+arrow-circle-left f0a8
+arrow-circle-o-down f01a
+arrow-circle-o-left f190
+arrow-circle-o-right f18e
+arrow-circle-o-up f01b
+arrow-circle-right f0a9
+arrow-circle-up f0aa
+arrow-down f063
+arrow-left f060
+arrow-right f061
+arrow-up f062
+arrows f047
+arrows-alt f0b2
+arrows-h f07e
+arrows-v f07d
+asterisk f069
+automobile f1b9
+backward f04a
+ban f05e
+bank f19c
+bar-chart-o f080
+barcode f02a
+bars f0c9
+beer f0fc
+behance f1b4
+behance-square f1b5
+bell f0f3
+bell-o f0a2
+bitbucket f171
+bitbucket-square f172
+bitcoin f15a
+bold f032
+bolt f0e7
+bomb f1e2
+book f02d
+bookmark f02e
+bookmark-o f097
+briefcase f0b1
+btc f15a
+bug f188
+building f1ad
+building-o f0f7
+bullhorn f0a1
+bullseye f140
+cab f1ba
+calendar f073
+calendar-o f133
+camera f030
+camera-retro f083
+car f1b9
+caret-down f0d7
+caret-left f0d9
+caret-right f0da
+caret-square-o-down f150
+caret-square-o-left f191
+caret-square-o-right f152
+caret-square-o-up f151
+caret-up f0d8
+certificate f0a3
+chain f0c1
+chain-broken f127
+check f00c
+check-circle f058
+check-circle-o f05d
+check-square f14a
+check-square-o f046
+chevron-circle-down f13a
+chevron-circle-left f137
+chevron-circle-right f138
+chevron-circle-up f139
+chevron-down f078
+chevron-left f053
+chevron-right f054
+chevron-up f077
+child f1ae
+circle f111
+circle-o f10c
+circle-o-notch f1ce
+circle-thin f1db
+clipboard f0ea
+clock-o f017
+cloud f0c2
+cloud-download f0ed
+cloud-upload f0ee
+cny f157
+code f121
+code-fork f126
+codepen f1cb
+coffee f0f4
+cog f013
+cogs f085
+columns f0db
+comment f075
+comment-o f0e5
+comments f086
+comments-o f0e6
+compass f14e
+compress f066
+copy f0c5
+credit-card f09d
+crop f125
+crosshairs f05b
+css3 f13c
+cube f1b2
+cubes f1b3
+cut f0c4
+cutlery f0f5
+dashboard f0e4
+database f1c0
+dedent f03b
+delicious f1a5
+desktop f108
+deviantart f1bd
+digg f1a6
+dollar f155
+dot-circle-o f192
+download f019
+dribbble f17d
+dropbox f16b
+drupal f1a9
+edit f044
+eject f052
+ellipsis-h f141
+ellipsis-v f142
+empire f1d1
+envelope f0e0
+envelope-o f003
+envelope-square f199
+eraser f12d
+eur f153
+euro f153
+exchange f0ec
+exclamation f12a
+exclamation-circle f06a
+exclamation-triangle f071
+expand f065
+external-link f08e
+external-link-square f14c
+eye f06e
+eye-slash f070
+facebook f09a
+facebook-square f082
+fast-backward f049
+fast-forward f050
+fax f1ac
+female f182
+fighter-jet f0fb
+file f15b
+file-archive-o f1c6
+file-audio-o f1c7
+file-code-o f1c9
+file-excel-o f1c3
+file-image-o f1c5
+file-movie-o f1c8
+file-o f016
+file-pdf-o f1c1
+file-photo-o f1c5
+file-picture-o f1c5
+file-powerpoint-o f1c4
+file-sound-o f1c7
+file-text f15c
+file-text-o f0f6
+file-video-o f1c8
+file-word-o f1c2
+file-zip-o f1c6
+files-o f0c5
+film f008
+filter f0b0
+fire f06d
+fire-extinguisher f134
+flag f024
+flag-checkered f11e
+flag-o f11d
+flash f0e7
+flask f0c3
+flickr f16e
+floppy-o f0c7
+folder f07b
+folder-o f114
+folder-open f07c
+folder-open-o f115
+font f031
+forward f04e
+foursquare f180
+frown-o f119
+gamepad f11b
+gavel f0e3
+gbp f154
+ge f1d1
+gear f013
+gears f085
+gift f06b
+git f1d3
+git-square f1d2
+github f09b
+github-alt f113
+github-square f092
+gittip f184
+glass f000
+globe f0ac
+google f1a0
+google-plus f0d5
+google-plus-square f0d4
+graduation-cap f19d
+group f0c0
+h-square f0fd
+hacker-news f1d4
+hand-o-down f0a7
+hand-o-left f0a5
+hand-o-right f0a4
+hand-o-up f0a6
+hdd-o f0a0
+header f1dc
+headphones f025
+heart f004
+heart-o f08a
+history f1da
+home f015
+hospital-o f0f8
+html5 f13b
+image f03e
+inbox f01c
+indent f03c
+info f129
+info-circle f05a
+inr f156
+instagram f16d
+institution f19c
+italic f033
+joomla f1aa
+jpy f157
+jsfiddle f1cc
+key f084
+keyboard-o f11c
+krw f159
+language f1ab
+laptop f109
+leaf f06c
+legal f0e3
+lemon-o f094
+level-down f149
+level-up f148
+life-bouy f1cd
+life-ring f1cd
+life-saver f1cd
+lightbulb-o f0eb
+link f0c1
+linkedin f0e1
+linkedin-square f08c
+linux f17c
+list f03a
+list-alt f022
+list-ol f0cb
+list-ul f0ca
+location-arrow f124
+lock f023
+long-arrow-down f175
+long-arrow-left f177
+long-arrow-right f178
+long-arrow-up f176
+magic f0d0
+magnet f076
+mail-forward f064
+mail-reply f112
+mail-reply-all f122
+male f183
+map-marker f041
+maxcdn f136
+medkit f0fa
+meh-o f11a
+microphone f130
+microphone-slash f131
+minus f068
+minus-circle f056
+minus-square f146
+minus-square-o f147
+mobile f10b
+mobile-phone f10b
+money f0d6
+moon-o f186
+mortar-board f19d
+music f001
+navicon f0c9
+openid f19b
+outdent f03b
+pagelines f18c
+paper-plane f1d8
+paper-plane-o f1d9
+paperclip f0c6
+paragraph f1dd
+paste f0ea
+pause f04c
+paw f1b0
+pencil f040
+pencil-square f14b
+pencil-square-o f044
+phone f095
+phone-square f098
+photo f03e
+picture-o f03e
+pied-piper f1a7
+pied-piper-alt f1a8
+pied-piper-square f1a7
+pinterest f0d2
+pinterest-square f0d3
+plane f072
+play f04b
+play-circle f144
+play-circle-o f01d
+plus f067
+plus-circle f055
+plus-square f0fe
+plus-square-o f196
+power-off f011
+print f02f
+puzzle-piece f12e
+qq f1d6
+qrcode f029
+question f128
+question-circle f059
+quote-left f10d
+quote-right f10e
+ra f1d0
+random f074
+rebel f1d0
+recycle f1b8
+reddit f1a1
+reddit-square f1a2
+refresh f021
+renren f18b
+reorder f0c9
+repeat f01e
+reply f112
+reply-all f122
+retweet f079
+rmb f157
+road f018
+rocket f135
+rotate-left f0e2
+rotate-right f01e
+rouble f158
+rss f09e
+rss-square f143
+rub f158
+ruble f158
+rupee f156
+save f0c7
+scissors f0c4
+search f002
+search-minus f010
+search-plus f00e
+send f1d8
+send-o f1d9
+share f064
+share-alt f1e0
+share-alt-square f1e1
+share-square f14d
+share-square-o f045
+shield f132
+shopping-cart f07a
+sign-in f090
+sign-out f08b
+signal f012
+sitemap f0e8
+skype f17e
+slack f198
+sliders f1de
+smile-o f118
+sort f0dc
+sort-alpha-asc f15d
+sort-alpha-desc f15e
+sort-amount-asc f160
+sort-amount-desc f161
+sort-asc f0de
+sort-desc f0dd
+sort-down f0dd
+sort-numeric-asc f162
+sort-numeric-desc f163
+sort-up f0de
+soundcloud f1be
+space-shuttle f197
+spinner f110
+spoon f1b1
+spotify f1bc
+square f0c8
+square-o f096
+stack-exchange f18d
+stack-overflow f16c
+star f005
+star-half f089
+star-half-empty f123
+star-half-full f123
+star-half-o f123
+star-o f006
+steam f1b6
+steam-square f1b7
+step-backward f048
+step-forward f051
+stethoscope f0f1
+stop f04d
+strikethrough f0cc
+stumbleupon f1a4
+stumbleupon-circle f1a3
+subscript f12c
+suitcase f0f2
+sun-o f185
+superscript f12b
+support f1cd
+table f0ce
+tablet f10a
+tachometer f0e4
+tag f02b
+tags f02c
+tasks f0ae
+taxi f1ba
+tencent-weibo f1d5
+terminal f120
+text-height f034
+text-width f035
+th f00a
+th-large f009
+th-list f00b
+thumb-tack f08d
+thumbs-down f165
+thumbs-o-down f088
+thumbs-o-up f087
+thumbs-up f164
+ticket f145
+times f00d
+times-circle f057
+times-circle-o f05c
+tint f043
+toggle-down f150
+toggle-left f191
+toggle-right f152
+toggle-up f151
+trash-o f014
+tree f1bb
+trello f181
+trophy f091
+truck f0d1
+try f195
+tumblr f173
+tumblr-square f174
+turkish-lira f195
+twitter f099
+twitter-square f081
+umbrella f0e9
+underline f0cd
+undo f0e2
+university f19c
+unlink f127
+unlock f09c
+unlock-alt f13e
+unsorted f0dc
+upload f093
+usd f155
+user f007
+user-md f0f0
+users f0c0
+video-camera f03d
+vimeo-square f194
+vine f1ca
+vk f189
+volume-down f027
+volume-off f026
+volume-up f028
+warning f071
+wechat f1d7
+weibo f18a
+weixin f1d7
+wheelchair f193
+windows f17a
+won f159
+wordpress f19a
+wrench f0ad
+xing f168
+xing-square f169
+yahoo f19e
+yen f157
+youtube f167
+youtube-play f16a
+youtube-square f166
+"""
+
+# Mapping of icon names to characters, None until load_icons() is called
+icons = None
+
+
+def load_icons():
+    """Returns the mapping of icon names to characters, loading it from
+    ICON_TABLE if the --css option hasn't replaced it."""
+    global icons
+    if icons is None:
+        icons = dict((name, uchr(int(code, 16)))
+                for name, code in (line.split() for line in
+                    ICON_TABLE.strip().splitlines()))
+    return icons
+
+
+class ListAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        for icon in sorted(load_icons().keys()):
+            print(icon)
+        exit(0)
+
+
+class ListUpdateAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        print('ICON_TABLE = """')
+        for icon, char in sorted(load_icons().items()):
+            print(u"%s %x" % (icon, ord(char)))
+        print('"""')
+        exit(0)
+
+
+class LRUCache(object):
+    """A bounded mapping which evicts the least recently used entries."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # Re-insert the entry to mark it as the most recently used one
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self._entries), "maxsize": self.maxsize}
+
+
+class FontCache(LRUCache):
+    """Cache of loaded fonts, keyed by font path, size and file mtime.
+
+    The modification time is part of the key, so a font file which is
+    replaced on disk is loaded again instead of being served stale.
+    """
+
+    def load(self, font, size):
+        key = (path.abspath(font), size, path.getmtime(font))
+        loaded = self.get(key)
+
+        if loaded is None:
+            from PIL import ImageFont
+            loaded = ImageFont.truetype(font, size)
+            self.put(key, loaded)
+
+        return loaded
+
+
+class MaskCache(LRUCache):
+    """Cache of rendered icon masks, bounded by the number of masks and,
+    if max_bytes is set, by the size of their pixels in bytes."""
+
+    def __init__(self, maxsize=128, max_bytes=None):
+        LRUCache.__init__(self, maxsize)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+    @staticmethod
+    def _sizeof(value):
+        return value[0].size[0] * value[0].size[1]
+
+    def put(self, key, value):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= self._sizeof(old)
+        self._entries[key] = value
+        self.bytes += self._sizeof(value)
+
+        # The newest mask is kept even if it's larger than max_bytes
+        while len(self._entries) > self.maxsize or (self.max_bytes and
+                self.bytes > self.max_bytes and len(self._entries) > 1):
+            self.bytes -= self._sizeof(self._entries.popitem(last=False)[1])
+
+    def clear(self):
+        LRUCache.clear(self)
+        self.bytes = 0
+
+    def stats(self):
+        stats = LRUCache.stats(self)
+        stats["bytes"] = self.bytes
+        return stats
+
+
+# Fonts shared by all the exported icons
+font_cache = FontCache()
+
+# Rasterized icon masks, reused when an icon is exported in several colors
+mask_cache = MaskCache(maxsize=64)
+
+
+class GlyphMetrics(object):
+    """Metrics of the glyphs of a TrueType font, in em units, read from the
+    font's tables without rasterizing anything.
+
+    glyphs maps codepoints to (advance, bbox) tuples, where bbox is the
+    (x_min, y_min, x_max, y_max) bounding box of the glyph's outline,
+    relative to its origin with y going up, or None if the glyph has no
+    outline. ascender and descender are the font's line metrics.
+    """
+
+    # Version of the cached metrics files
+    VERSION = 1
+
+    def __init__(self, ascender, descender, glyphs):
+        self.ascender = ascender
+        self.descender = descender
+        self.glyphs = glyphs
+
+    @staticmethod
+    def read_tables(data):
+        """Returns the tables of an sfnt font file as a dictionary of tags
+        and table data."""
+        import struct
+
+        version, count = struct.unpack(">4sH", data[:6])
+        if version not in (b"\0\1\0\0", b"true", b"OTTO"):
+            raise ValueError("not a TrueType or OpenType font")
+
+        tables = {}
+        for i in range(count):
+            tag, checksum, offset, length = struct.unpack(">4sIII",
+                    data[12 + 16 * i:28 + 16 * i])
+            tables[tag.decode("latin-1")] = data[offset:offset + length]
+        return tables
+
+    @staticmethod
+    def read_loca(head, loca):
+        """Returns the offsets of the glyphs in the glyf table, from a loca
+        table in the format given by the head table."""
+        import struct
+
+        if struct.unpack(">h", head[50:52])[0]:
+            return struct.unpack(">%iI" % (len(loca) // 4), loca)
+        return [offset * 2 for offset in
+                struct.unpack(">%iH" % (len(loca) // 2), loca)]
+
+    @staticmethod
+    def read_cmap(cmap):
+        """Returns the mapping of codepoints to glyph indices of a cmap
+        table, from its Unicode subtable in format 4 or 12."""
+        import struct
+
+        subtables = {}
+        count = struct.unpack(">H", cmap[2:4])[0]
+        for i in range(count):
+            platform, encoding, offset = struct.unpack(">HHI",
+                    cmap[4 + 8 * i:12 + 8 * i])
+            subtables[(platform, encoding)] = offset
+
+        for key in ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3)):
+            if key in subtables:
+                offset = subtables[key]
+                break
+        else:
+            raise ValueError("no Unicode cmap subtable")
+
+        chars = {}
+        subtable_format = struct.unpack(">H", cmap[offset:offset + 2])[0]
+        if subtable_format == 4:
+            segments = struct.unpack(">H", cmap[offset + 6:offset + 8])[0] // 2
+            arrays = offset + 14
+            ends = struct.unpack(">%iH" % segments,
+                    cmap[arrays:arrays + 2 * segments])
+            arrays += 2 * segments + 2
+            starts, deltas, range_offsets = [struct.unpack(">%iH" % segments,
+                    cmap[arrays + 2 * segments * i:
+                    arrays + 2 * segments * (i + 1)]) for i in range(3)]
+            range_base = arrays + 4 * segments
+
+            for i in range(segments):
+                for code in range(starts[i], min(ends[i], 0xFFFE) + 1):
+                    if range_offsets[i]:
+                        address = range_base + 2 * i + range_offsets[i] + \
+                                2 * (code - starts[i])
+                        glyph = struct.unpack(">H",
+                                cmap[address:address + 2])[0]
+                        if glyph:
+                            glyph = (glyph + deltas[i]) & 0xFFFF
+                    else:
+                        glyph = (code + deltas[i]) & 0xFFFF
+                    if glyph:
+                        chars[code] = glyph
+        elif subtable_format == 12:
+            groups = struct.unpack(">I", cmap[offset + 12:offset + 16])[0]
+            for i in range(groups):
+                start, end, glyph = struct.unpack(">III",
+                        cmap[offset + 16 + 12 * i:offset + 28 + 12 * i])
+                for code in range(start, end + 1):
+                    chars[code] = glyph + code - start
+        else:
+            raise ValueError("unsupported cmap format %i" % subtable_format)
+        return chars
+
+    @classmethod
+    def read(cls, filename):
+        """Reads the metrics of the glyphs of a font file. Raises ValueError
+        if it isn't a TrueType font with glyph outlines in a glyf table."""
+        import struct
+
+        with open(filename, "rb") as f:
+            tables = cls.read_tables(f.read())
+
+        try:
+            head, hhea, hmtx = tables["head"], tables["hhea"], tables["hmtx"]
+            loca, glyf, cmap = tables["loca"], tables["glyf"], tables["cmap"]
+        except KeyError as e:
+            raise ValueError("no %s table" % e)
+
+        try:
+            units_per_em = float(struct.unpack(">H", head[18:20])[0])
+            ascender, descender = struct.unpack(">hh", hhea[4:8])
+            metrics_count = struct.unpack(">H", hhea[34:36])[0]
+            offsets = cls.read_loca(head, loca)
+            advances = struct.unpack(">%iH" % metrics_count,
+                    b"".join(hmtx[4 * i:4 * i + 2]
+                    for i in range(metrics_count)))
+
+            glyphs = {}
+            for code, glyph in cls.read_cmap(cmap).items():
+                if glyph + 1 >= len(offsets):
+                    continue
+                advance = advances[min(glyph, metrics_count - 1)]
+                bbox = None
+                if offsets[glyph + 1] > offsets[glyph]:
+                    contours, x_min, y_min, x_max, y_max = struct.unpack(
+                            ">hhhhh", glyf[offsets[glyph]:offsets[glyph] + 10])
+                    if contours:
+                        bbox = (x_min / units_per_em, y_min / units_per_em,
+                                x_max / units_per_em, y_max / units_per_em)
+                glyphs[code] = (advance / units_per_em, bbox)
+        except struct.error:
+            raise ValueError("truncated font tables")
+
+        return cls(ascender / units_per_em, descender / units_per_em, glyphs)
+
+    @classmethod
+    def load(cls, filename, cache_dir=None):
+        """Returns the metrics of the glyphs of a font file, or None if they
+        can't be read. The metrics are cached in memory and, with cache_dir
+        (see default_cache_dir), in a file in that directory keyed by the
+        font's hash."""
+        key = (path.abspath(filename), path.getmtime(filename))
+        cached = glyph_metrics_cache.get(key)
+        if cached is not None:
+            return cached or None
+
+        cache_filename = cache_dir and path.join(cache_dir,
+                "metrics-%s.json" % font_hash(filename))
+
+        metrics = None
+        if cache_filename:
+            try:
+                with open(cache_filename, "rb") as f:
+                    cached = json.loads(f.read().decode("utf-8"))
+                if cached["version"] == cls.VERSION:
+                    metrics = cls(cached["ascender"], cached["descender"],
+                            dict((glyph[0], (glyph[1], tuple(glyph[2:]) or None))
+                            for glyph in cached["glyphs"]))
+            except (IOError, ValueError, KeyError, TypeError, IndexError):
+                pass
+
+        if metrics is None:
+            try:
+                metrics = cls.read(filename)
+            except (IOError, ValueError):
+                # Remember that the font can't be read
+                glyph_metrics_cache.put(key, False)
+                return None
+
+            if cache_filename:
+                write_cache_file(cache_filename, json.dumps({
+                    "version": cls.VERSION,
+                    "ascender": metrics.ascender,
+                    "descender": metrics.descender,
+                    "glyphs": sorted([code, advance] + list(bbox or [])
+                        for code, (advance, bbox) in metrics.glyphs.items()),
+                }, separators=(",", ":")).encode("utf-8"))
+
+        glyph_metrics_cache.put(key, metrics)
+        return metrics
+
+
+# Glyph metrics of the fonts used, keyed by font path and mtime
+glyph_metrics_cache = LRUCache(maxsize=8)
+
+
+def glyph_digests(filename):
+    """Returns a digest of each glyph of a TrueType font, by codepoint, which
+    changes when the glyph's outline or metrics change. Comparing the
+    digests of two versions of a font tells which glyphs changed.
+
+    The tables which affect all glyphs (line metrics, hinting programs) are
+    part of every digest. Returns None if the font can't be read.
+    """
+    import struct
+
+    try:
+        with open(filename, "rb") as f:
+            tables = GlyphMetrics.read_tables(f.read())
+        head, hhea, hmtx = tables["head"], tables["hhea"], tables["hmtx"]
+        loca, glyf = tables["loca"], tables["glyf"]
+        chars = GlyphMetrics.read_cmap(tables["cmap"])
+
+        # Only the parts of the global tables which affect rendering are
+        # used -- e.g. the checksum and dates in head change on every save,
+        # and the maximums in hhea whenever a glyph is added: the units per
+        # em, the flags, the ascender, descender and line gap (from hhea and
+        # OS/2), and the hinting tables
+        common = hashlib.sha1(head[16:20] + head[50:52] + hhea[4:10] +
+                tables.get("OS/2", b"")[68:78])
+        for tag in ("cvt ", "fpgm", "prep", "gasp"):
+            common.update(tag.encode("latin-1") + tables.get(tag, b""))
+        common = common.digest()
+
+        offsets = GlyphMetrics.read_loca(head, loca)
+        metrics_count = struct.unpack(">H", hhea[34:36])[0]
+        glyf_digest = None
+
+        digests = {}
+        for code, glyph in chars.items():
+            if glyph + 1 >= len(offsets):
+                continue
+            data = glyf[offsets[glyph]:offsets[glyph + 1]]
+            metrics = hmtx[4 * min(glyph, metrics_count - 1):][:4]
+            digest = hashlib.sha1(common + metrics + data)
+            if data[:2] and struct.unpack(">h", data[:2])[0] < 0:
+                # A composite glyph changes with the glyphs it's made of
+                if glyf_digest is None:
+                    glyf_digest = hashlib.sha1(glyf).digest()
+                digest.update(glyf_digest)
+            digests[code] = digest.hexdigest()
+        return digests
+    except (IOError, KeyError, ValueError, struct.error):
+        return None
+
+
+def _svg_number(value):
+    """Formats a coordinate for SVG path data, as short as possible."""
+    text = ("%.2f" % value).rstrip("0").rstrip(".")
+    if text in ("", "-0"):
+        return "0"
+    return text.replace("0.", ".", 1) if text.lstrip("-").startswith("0.") \
+            else text
+
+
+class GlyphOutlines(object):
+    """Outlines of the glyphs of a font, as SVG path data in font units, with
+    y going down as in SVG.
+
+    The outlines are read from the font's glyf table, or from its CFF table
+    if fontTools is installed. glyphs maps codepoints to (path, bbox)
+    tuples, where bbox is the (x_min, y_min, x_max, y_max) bounding box of
+    the glyph's outline, or None if the glyph has no outline.
+    units_per_em is the size of the em square.
+    """
+
+    def __init__(self, units_per_em, glyphs):
+        self.units_per_em = units_per_em
+        self.glyphs = glyphs
+
+    @classmethod
+    def read_glyph(cls, glyf, offsets, glyph, depth=0):
+        """Returns the contours of a glyph in a glyf table, as lists of
+        (x, y, on_curve) points. The components of composite glyphs are
+        transformed into place."""
+        import struct
+
+        if glyph + 1 >= len(offsets):
+            return []
+        data = glyf[offsets[glyph]:offsets[glyph + 1]]
+        if len(data) < 10:
+            return []
+
+        count = struct.unpack_from(">h", data)[0]
+        if count < 0:
+            contours = []
+            offset = 10
+            more = True
+            while more:
+                flags, component = struct.unpack_from(">HH", data, offset)
+                offset += 4
+                if flags & 0x1:
+                    dx, dy = struct.unpack_from(">hh" if flags & 0x2
+                            else ">HH", data, offset)
+                    offset += 4
+                else:
+                    dx, dy = struct.unpack_from(">bb" if flags & 0x2
+                            else ">BB", data, offset)
+                    offset += 2
+                if not flags & 0x2:
+                    # Components aligned by matching points aren't supported
+                    dx, dy = 0, 0
+
+                a, b, c, d = 1, 0, 0, 1
+                if flags & 0x8:
+                    a = d = struct.unpack_from(">h", data, offset)[0] / 16384.0
+                    offset += 2
+                elif flags & 0x40:
+                    a, d = [value / 16384.0 for value in
+                            struct.unpack_from(">hh", data, offset)]
+                    offset += 4
+                elif flags & 0x80:
+                    a, b, c, d = [value / 16384.0 for value in
+                            struct.unpack_from(">hhhh", data, offset)]
+                    offset += 8
+
+                if depth < 8:
+                    for contour in cls.read_glyph(glyf, offsets, component,
+                            depth + 1):
+                        contours.append([(a * x + c * y + dx,
+                                b * x + d * y + dy, on_curve)
+                                for x, y, on_curve in contour])
+                more = flags & 0x20
+            return contours
+
+        ends = struct.unpack_from(">%iH" % count, data, 10)
+        points = ends[-1] + 1 if ends else 0
+        offset = 10 + 2 * count
+        offset += 2 + struct.unpack_from(">H", data, offset)[0]
+
+        # Flags, with repeat counts
+        flags = []
+        while len(flags) < points:
+            flag = struct.unpack_from(">B", data, offset)[0]
+            offset += 1
+            flags.append(flag)
+            if flag & 0x8:
+                flags.extend([flag] * struct.unpack_from(">B", data,
+                        offset)[0])
+                offset += 1
+        flags = flags[:points]
+
+        # Coordinates, as deltas which are short (one byte, the sign in the
+        # flags) or long, or left out when they're zero
+        coordinates = []
+        for short, same in ((0x2, 0x10), (0x4, 0x20)):
+            value = 0
+            values = []
+            for flag in flags:
+                if flag & short:
+                    delta = struct.unpack_from(">B", data, offset)[0]
+                    offset += 1
+                    value += delta if flag & same else -delta
+                elif not flag & same:
+                    value += struct.unpack_from(">h", data, offset)[0]
+                    offset += 2
+                values.append(value)
+            coordinates.append(values)
+
+        points = list(zip(coordinates[0], coordinates[1],
+                [flag & 0x1 for flag in flags]))
+        contours = []
+        start = 0
+        for end in ends:
+            contours.append(points[start:end + 1])
+            start = end + 1
+        return contours
+
+    @staticmethod
+    def path_data(contours):
+        """Returns the SVG path data of TrueType contours (in font units,
+        with y going up), and the bounding box of the outline."""
+        commands = []
+        bounds = []
+
+        for contour in contours:
+            # Flip the y axis
+            contour = [(round(x, 2), round(-y, 2), on_curve)
+                    for x, y, on_curve in contour]
+            if not contour:
+                continue
+
+            # Start at an on-curve point, or between two off-curve points
+            for i, point in enumerate(contour):
+                if point[2]:
+                    contour = contour[i:] + contour[:i]
+                    start, contour = contour[0][:2], contour[1:]
+                    break
+            else:
+                start = ((contour[-1][0] + contour[0][0]) / 2.0,
+                        (contour[-1][1] + contour[0][1]) / 2.0)
+
+            commands.append(("m", start))
+            bounds.append(start)
+            current, control = start, None
+            for i, point in enumerate(contour + [start + (1,)]):
+                if point[2]:
+                    end = point[:2]
+                elif control is not None:
+                    # Two off-curve points imply an on-curve one between them
+                    end = ((control[0] + point[0]) / 2.0,
+                            (control[1] + point[1]) / 2.0)
+                else:
+                    control = point[:2]
+                    continue
+
+                if control is not None:
+                    commands.append(("q", control, end))
+                    # The curve's extremes are at its ends, or where its
+                    # derivative is zero
+                    extreme = []
+                    for axis in range(2):
+                        divisor = current[axis] - 2 * control[axis] + end[axis]
+                        t = (current[axis] - control[axis]) / float(divisor) \
+                                if divisor else 0
+                        t = t if 0 < t < 1 else 0
+                        extreme.append((1 - t) ** 2 * current[axis] +
+                                2 * (1 - t) * t * control[axis] +
+                                t ** 2 * end[axis])
+                    bounds.append(extreme)
+                elif i < len(contour):
+                    # The line back to the start is left to closepath
+                    commands.append(("l", end))
+                bounds.append(end)
+                current = end
+                control = None if point[2] else point[:2]
+            commands.append(("z",))
+
+        if not bounds:
+            return "", None
+
+        # Relative coordinates, leaving out repeated commands and the spaces
+        # before minus signs
+        data = []
+        origin = current = (0, 0)
+        previous = None
+        for command in commands:
+            letter, points = command[0], command[1:]
+            separate = letter == previous and letter != "m"
+            if not separate:
+                data.append(letter)
+            previous = letter
+
+            for x, y in points:
+                for number in (_svg_number(x - current[0]),
+                        _svg_number(y - current[1])):
+                    if separate and not number.startswith("-"):
+                        data.append(" ")
+                    data.append(number)
+                    separate = True
+
+            if letter == "z":
+                current = origin
+            else:
+                current = points[-1]
+                if letter == "m":
+                    origin = current
+
+        return "".join(data), (min(x for x, y in bounds),
+                min(y for x, y in bounds), max(x for x, y in bounds),
+                max(y for x, y in bounds))
+
+    @classmethod
+    def read(cls, filename):
+        """Reads the outlines of the glyphs of a font file. Raises ValueError
+        if the font has no outlines which can be read."""
+        import struct
+
+        with open(filename, "rb") as f:
+            tables = GlyphMetrics.read_tables(f.read())
+
+        if "glyf" not in tables and "CFF " in tables:
+            return cls.read_cff(filename)
+
+        try:
+            head, loca = tables["head"], tables["loca"]
+            glyf, cmap = tables["glyf"], tables["cmap"]
+        except KeyError as e:
+            raise ValueError("no %s table" % e)
+
+        try:
+            units_per_em = struct.unpack(">H", head[18:20])[0]
+            offsets = GlyphMetrics.read_loca(head, loca)
+            glyphs = {}
+            for code, glyph in GlyphMetrics.read_cmap(cmap).items():
+                if glyph + 1 < len(offsets):
+                    glyphs[code] = cls.path_data(
+                            cls.read_glyph(glyf, offsets, glyph))
+        except struct.error:
+            raise ValueError("truncated font tables")
+
+        return cls(units_per_em, glyphs)
+
+    @classmethod
+    def read_cff(cls, filename):
+        """Reads the outlines of the glyphs of an OpenType font with a CFF
+        table, using fontTools."""
+        try:
+            from fontTools.ttLib import TTFont
+            from fontTools.pens.boundsPen import BoundsPen
+            from fontTools.pens.svgPathPen import SVGPathPen
+            from fontTools.pens.transformPen import TransformPen
+        except ImportError:
+            raise ValueError("reading CFF outlines requires fontTools")
+
+        font = TTFont(filename)
+        glyph_set = font.getGlyphSet()
+        glyphs = {}
+        for code, name in font.getBestCmap().items():
+            # Flip the y axis
+            path_pen = SVGPathPen(glyph_set)
+            bounds_pen = BoundsPen(glyph_set)
+            glyph_set[name].draw(TransformPen(path_pen, (1, 0, 0, -1, 0, 0)))
+            glyph_set[name].draw(TransformPen(bounds_pen,
+                    (1, 0, 0, -1, 0, 0)))
+            glyphs[code] = (path_pen.getCommands(), bounds_pen.bounds)
+        return cls(font["head"].unitsPerEm, glyphs)
+
+    @classmethod
+    def load(cls, filename):
+        """Returns the outlines of the glyphs of a font file, read once per
+        font file and kept in memory."""
+        key = (path.abspath(filename), path.getmtime(filename))
+        outlines = glyph_outlines_cache.get(key)
+        if outlines is None:
+            outlines = cls.read(filename)
+            glyph_outlines_cache.put(key, outlines)
+        return outlines
+
+    def view_box(self, code):
+        """Returns the viewBox of a square of the em size, with the glyph of
+        a codepoint centered in it, as in the rendered images."""
+        bbox = self.glyphs.get(code, (None, None))[1]
+        size = self.units_per_em
+        if not bbox:
+            return "0 0 %i %i" % (size, size)
+        return "%s %s %i %i" % (
+                _svg_number((bbox[0] + bbox[2] - size) / 2.0),
+                _svg_number((bbox[1] + bbox[3] - size) / 2.0), size, size)
+
+
+# Glyph outlines of the fonts used, keyed by font path and mtime
+glyph_outlines_cache = LRUCache(maxsize=4)
+
+
+def glyph_coverage(font, icon_map, icons, cache_dir=None):
+    """Checks that a TrueType font has a glyph for each of icons (names in
+    icon_map), reading only its cmap and glyph metrics (see GlyphMetrics,
+    cached in cache_dir if given) -- nothing is rendered.
+
+    Returns a (missing, empty) tuple of lists of the icons without a glyph,
+    and of those whose glyph has no outline, which would be exported as
+    blank images. Returns None if the font's tables can't be read.
+    """
+    metrics = GlyphMetrics.load(font, cache_dir)
+    if metrics is None:
+        return None
+
+    missing, empty = [], []
+    for icon in icons:
+        glyph = metrics.glyphs.get(ord(icon_map[icon]))
+        if glyph is None:
+            missing.append(icon)
+        elif not glyph[1] or glyph[1][0] >= glyph[1][2] or \
+                glyph[1][1] >= glyph[1][3]:
+            empty.append(icon)
+    return missing, empty
+
+
+class MaskStore(object):
+    """A cache of rendered icon masks on disk, shared by all runs and worker
+    processes.
+
+    Masks are kept as raw 8-bit alpha values in a single pack file, each
+    record a header followed by the pixels. The headers are indexed through
+    a memory map of the file, but the pixels are read with plain reads, so
+    they don't stay in the memory of the process once the mask is freed.
+    Records are addressed by a digest of everything the mask depends on
+    (see key), so a changed font or renderer never hits an old record.
+    The header also holds a CRC-32 of the pixels, and a record which is cut
+    short or doesn't match it (say, left by a process killed while writing)
+    ends the pack: it and anything after it are never read.
+
+    New records are appended while holding an exclusive lock (on systems
+    with fcntl -- elsewhere nothing is written), so several processes can
+    add masks at the same time. Each is written in a single call, after
+    truncating the pack back to its last valid record. When the pack grows
+    beyond max_bytes, it's rewritten with the most recently added records
+    which fit in half of it.
+    Masks larger than a sixteenth of max_bytes aren't stored.
+    Any errors are ignored, as a mask which can't be cached only has to be
+    rendered again.
+    """
+
+    MAGIC = b"FAM2"
+
+    # Magic, key digest, width, height and offset of the mask, and the
+    # length and CRC-32 of the pixels that follow
+    HEADER = ">4s20sHHhhII"
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.filename = path.join(directory, "masks.pack")
+        self.lock_filename = path.join(directory, "masks.lock")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._file = None
+        self._map = None
+        self._lock_file = None
+        self._pack = None
+        self._pack_end = 0
+        self._close()
+
+    # The open pack file can't be sent to worker processes, they open it
+    # again on their own
+    def __getstate__(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def key(font_hash, char, size):
+        """Returns the digest identifying the mask of a character of a font
+        (given by its hash), rendered at a size. The versions of Pillow and
+        FreeType are part of it, as they affect rasterization."""
+        import PIL
+        from PIL import ImageFont
+        key = (font_hash, ord(char), size, RENDERER_VERSION,
+                getattr(PIL, "__version__", None),
+                getattr(ImageFont.core, "freetype2_version", None))
+        return hashlib.sha1(repr(key).encode("utf-8")).digest()
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._map = self._inode = None
+        self._index = {}
+        self._scanned = 0
+
+    def _records(self, read, size, offset=0):
+        """Yields the (digest, width, height, x, y, start, end, checksum) of
+        each valid record in a pack of some size, from offset on, where
+        read(start, length) returns its bytes. start and end are the offsets
+        of the pixels and of the next record. Stops at the first record
+        which is cut short or whose pixels don't match their checksum."""
+        import struct, zlib
+
+        header_size = struct.calcsize(self.HEADER)
+        while offset + header_size <= size:
+            magic, digest, width, height, x, y, length, checksum = \
+                    struct.unpack(self.HEADER, read(offset, header_size))
+            start = offset + header_size
+            end = start + length
+            if magic != self.MAGIC or length != width * height \
+                    or end > size or zlib.crc32(read(start, length)) \
+                    & 0xffffffff != checksum:
+                break
+            yield digest, width, height, x, y, start, end, checksum
+            offset = end
+
+    def _refresh(self):
+        """Maps the pack file again if it has grown or was replaced (when
+        it's compacted), and indexes the records added since."""
+        import mmap
+
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            self._close()
+            return
+
+        if self._inode != (stat.st_dev, stat.st_ino):
+            self._close()
+            self._file = open(self.filename, "rb")
+            self._inode = (stat.st_dev, stat.st_ino)
+
+        # The pack may also have been truncated after an invalid record
+        # and appended to again
+        mapped = len(self._map) if self._map is not None else 0
+        if stat.st_size == mapped:
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if stat.st_size <= self._scanned:
+            self._scanned = min(self._scanned, stat.st_size)
+            return
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                access=mmap.ACCESS_READ)
+
+        pack = self._map
+        for digest, width, height, x, y, start, end, checksum in \
+                self._records(lambda offset, length:
+                    pack[offset:offset + length],
+                    len(pack), self._scanned):
+            self._index[digest] = (start, width, height, x, y, checksum)
+            self._scanned = end
+
+    def get(self, key):
+        """Returns the (mask, (x, y)) stored with a key, or None."""
+        import zlib
+        with self.lock:
+            entry = self._index.get(key)
+            if entry is None:
+                try:
+                    self._refresh()
+                except (IOError, OSError, ValueError):
+                    self._close()
+                entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            start, width, height, x, y, checksum = entry
+            try:
+                self._file.seek(start)
+                data = self._file.read(width * height)
+            except (IOError, OSError, ValueError):
+                data = b""
+            if len(data) != width * height \
+                    or zlib.crc32(data) & 0xffffffff != checksum:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        from PIL import Image
+        return Image.frombytes("L", (width, height), data), (x, y)
+
+    def put(self, key, mask, offset):
+        """Stores a mask and its (x, y) offset with a key."""
+        import struct, zlib
+        try:
+            import fcntl
+        except ImportError:
+            return
+
+        # Masks of huge icons would push all the others out
+        length = mask.size[0] * mask.size[1]
+        if length > self.max_bytes // 16:
+            return
+
+        pixels = mask.tobytes()
+        record = struct.pack(self.HEADER, self.MAGIC, key, mask.size[0],
+                mask.size[1], offset[0], offset[1], length,
+                zlib.crc32(pixels) & 0xffffffff) + pixels
+
+        with self.lock:
+            try:
+                if self._lock_file is None:
+                    if not path.isdir(self.directory):
+                        os.makedirs(self.directory)
+                    self._lock_file = open(self.lock_filename, "a")
+
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    # Append to the current pack file, which another process
+                    # may have replaced
+                    if self._pack is None or os.fstat(self._pack.fileno()) \
+                            .st_ino != os.stat(self.filename).st_ino:
+                        raise OSError
+                except OSError:
+                    if self._pack is not None:
+                        self._pack.close()
+                    self._pack = open(self.filename, "ab")
+                    self._pack_end = 0
+                try:
+                    # Drop whatever follows the last valid record, so the
+                    # new one isn't hidden behind it. Records up to
+                    # _pack_end were checked before
+                    size = os.fstat(self._pack.fileno()).st_size
+                    if size != self._pack_end:
+                        with open(self.filename, "rb") as pack:
+                            def read(start, length):
+                                pack.seek(start)
+                                return pack.read(length)
+                            end = min(self._pack_end, size)
+                            for record_info in self._records(read, size,
+                                    end):
+                                end = record_info[6]
+                        if end < size:
+                            os.ftruncate(self._pack.fileno(), end)
+                        self._pack_end = end
+                    self._pack.write(record)
+                    self._pack.flush()
+                    self._pack_end += len(record)
+                    if self._pack.tell() > self.max_bytes:
+                        self._compact()
+                finally:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            except (IOError, OSError):
+                pass
+
+    def _compact(self):
+        """Rewrites the pack file with the most recently added records that
+        fit in half of max_bytes. Must be called with the lock held."""
+        import struct
+
+        header_size = struct.calcsize(self.HEADER)
+        with open(self.filename, "rb") as pack:
+            def read(start, length):
+                pack.seek(start)
+                return pack.read(length)
+            records = [(record_info[0], record_info[5] - header_size,
+                    record_info[6]) for record_info in self._records(read,
+                    os.fstat(pack.fileno()).st_size)]
+
+            kept = []
+            seen = set()
+            size = 0
+            for digest, start, end in reversed(records):
+                if digest in seen:
+                    continue
+                if size + end - start > self.max_bytes // 2:
+                    break
+                seen.add(digest)
+                kept.append((start, end))
+                size += end - start
+            kept.reverse()
+
+            # Other processes keep reading the old file until they see it
+            # was replaced
+            tmp_filename = "%s.%i.tmp" % (self.filename, os.getpid())
+            try:
+                with open(tmp_filename, "wb") as f:
+                    for start, end in kept:
+                        pack.seek(start)
+                        f.write(pack.read(end - start))
+                os.rename(tmp_filename, self.filename)
+            finally:
+                if path.exists(tmp_filename):
+                    os.remove(tmp_filename)
+        self._pack.close()
+        self._pack = None
+        self._close()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self._index)}
+
+
+# Number of memory blocks allocated by the interpreter, where available
+_allocated_blocks = getattr(sys, "getallocatedblocks", lambda: 0)
+
+
+def percentile(values, fraction):
+    """Returns the value at fraction (0 to 1) of sorted values, by the
+    nearest rank method."""
+    if not values:
+        return 0
+    return values[max(0, int(math.ceil(fraction * len(values))) - 1)]
+
+
+class ExportStats(object):
+    """Records the wall time and the net block delta in each stage of
+    exporting each image.
+
+    Stages are timed between marks:
+
+        stats.begin("play.png")
+        mark = stats.mark()
+        draw()
+        mark = stats.record("draw", mark)
+        encode()
+        stats.record("encode", mark)
+
+    The net block delta is the change of the number of memory blocks
+    allocated by the interpreter (0 where it isn't known): blocks freed in a
+    stage offset those allocated, so it's no count of allocations.
+    """
+
+    def __init__(self):
+        # Image name -> OrderedDict of stage -> [seconds, blocks]
+        self.images = OrderedDict()
+        self.current = None
+        self.start = time.time()
+        self.end = None
+
+    def begin(self, name):
+        """Starts recording the stages of an image."""
+        self.current = self.images.setdefault(name, OrderedDict())
+
+    def mark(self):
+        return time.time(), _allocated_blocks()
+
+    def record(self, stage, mark):
+        """Adds the time and net block delta since mark to a stage of the
+        current image. Returns a new mark."""
+        now = time.time(), _allocated_blocks()
+        if self.current is not None:
+            totals = self.current.setdefault(stage, [0.0, 0])
+            totals[0] += now[0] - mark[0]
+            totals[1] += now[1] - mark[1]
+        return now
+
+    def add(self, name, stages):
+        """Adds the stages of an image recorded by another ExportStats, e.g.
+        in a worker process."""
+        image = self.images.setdefault(name, OrderedDict())
+        for stage, (seconds, blocks) in stages.items():
+            totals = image.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += blocks
+
+    def stop(self):
+        self.end = time.time()
+
+    def report(self, slowest=10):
+        """Returns the totals and percentiles of each stage, and the slowest
+        images, as a dictionary."""
+        elapsed = (self.end or time.time()) - self.start
+
+        stages = OrderedDict()
+        for image in self.images.values():
+            for stage, totals in image.items():
+                stages.setdefault(stage, []).append(totals)
+
+        summary = OrderedDict()
+        for stage, values in stages.items():
+            seconds = sorted(value[0] for value in values)
+            summary[stage] = OrderedDict([
+                ("images", len(values)),
+                ("total", sum(seconds)),
+                ("p50", percentile(seconds, 0.5)),
+                ("p95", percentile(seconds, 0.95)),
+                ("block_delta", sum(value[1] for value in values)),
+            ])
+
+        totals = sorted(((sum(value[0] for value in image.values()), name)
+                for name, image in self.images.items()), reverse=True)
+
+        return OrderedDict([
+            ("elapsed", elapsed),
+            ("images", len(self.images)),
+            ("stages", summary),
+            ("slowest", [OrderedDict([
+                ("name", name), ("total", total),
+                ("stages", OrderedDict((stage, values[0]) for stage, values
+                    in self.images[name].items())),
+            ]) for total, name in totals[:slowest]]),
+        ])
+
+    def format_report(self, slowest=10):
+        """Returns the report as human-readable text."""
+        report = self.report(slowest)
+        lines = ["%-10s  %7s  %10s  %8s  %8s  %15s" % ("stage", "images",
+                "total ms", "p50 ms", "p95 ms", "net block delta")]
+        for stage, values in report["stages"].items():
+            lines.append("%-10s  %7i  %10.2f  %8.3f  %8.3f  %15i" % (stage,
+                    values["images"], values["total"] * 1000,
+                    values["p50"] * 1000, values["p95"] * 1000,
+                    values["block_delta"]))
+
+        staged = sum(values["total"] for values in report["stages"].values())
+        lines.append("Exported %i images in %.2f ms, %.2f ms of it in the "
+                "stages above" % (report["images"], report["elapsed"] * 1000,
+                staged * 1000))
+
+        if report["slowest"]:
+            lines.append("Slowest images:")
+        for image in report["slowest"]:
+            lines.append("  %s: %.3f ms (%s)" % (image["name"],
+                    image["total"] * 1000, ", ".join("%s %.3f" %
+                    (stage, seconds * 1000)
+                    for stage, seconds in image["stages"].items())))
+        return "\n".join(lines)
+
+
+def text_size(font, text):
+    """Returns the (width, height) of the text drawn with the given font."""
+    if hasattr(font, "getbbox"):
+        # Pillow 8.0.0 and later (getsize was removed in Pillow 10.0.0)
+        bbox = font.getbbox(text)
+        return bbox[2], bbox[3]
+    else:
+        return font.getsize(text)
+
+
+def reduce_single_color(image, color):
+    """Converts an RGBA image whose visible pixels are all of one color to
+    an equivalent image in a smaller PNG mode.
+
+    Gray colors give a grayscale with alpha ("LA") image, other colors give
+    a palette ("P") image with one entry for each alpha level used. Alpha
+    values are kept exactly; only fully transparent pixels may change their
+    (invisible) color. Returns an (image, save options) tuple.
+    """
+    from PIL import Image, ImageColor
+
+    rgb = ImageColor.getrgb(color)[:3]
+    alpha = image.split()[3]
+
+    if rgb[0] == rgb[1] == rgb[2]:
+        return Image.merge("LA", (Image.new("L", image.size, rgb[0]),
+                alpha)), {}
+
+    # Map each alpha level used to a palette index
+    levels = [level for level, count in enumerate(alpha.histogram()) if count]
+    lut = [0] * 256
+    for index, level in enumerate(levels):
+        lut[level] = index
+
+    indexed = Image.frombytes("P", image.size, alpha.point(lut).tobytes())
+    indexed.putpalette(list(rgb) * len(levels))
+
+    options = {"transparency": bytes(bytearray(levels))}
+    for bits in (1, 2, 4):
+        if len(levels) <= 2 ** bits:
+            options["bits"] = bits
+            break
+
+    return indexed, options
+
+
+def parse_color_spec(spec):
+    """Parses a color specification: an HTML color code or name, or a
+    vertical linear gradient given as two colors, "TOP:BOTTOM" (e.g.
+    "#ff0000:#0000ff").
+
+    Returns a list of one or two (r, g, b) tuples. Raises ValueError if the
+    specification is invalid.
+    """
+    from PIL import ImageColor
+
+    colors = spec.split(":")
+    if len(colors) > 2:
+        raise ValueError("invalid color specification: %r" % spec)
+    return [ImageColor.getrgb(color.strip())[:3] for color in colors]
+
+
+def canonical_color(spec):
+    """Returns a color specification (see parse_color_spec) in a single
+    form, "#rrggbb" or "#rrggbb:#rrggbb", so that different specifications
+    of the same colors compare equal. Raises ValueError if it's invalid."""
+    return ":".join("#%02x%02x%02x" % tuple(color)
+            for color in parse_color_spec(spec))
+
+
+def gradient_rows(stops, height):
+    """Returns the (r, g, b) color of each row of an image of the given
+    height, filled with one color or a vertical gradient between two."""
+    if len(stops) == 1 or height == 1:
+        return [tuple(stops[0])] * height
+    top, bottom = stops
+    return [tuple(int(a + (b - a) * y / float(height - 1) + 0.5)
+            for a, b in zip(top, bottom)) for y in range(height)]
+
+
+def recolor_mask(mask, colors):
+    """Applies an alpha mask to each of a list of color specifications (see
+    parse_color_spec). Returns a list of RGBA images of the mask's size.
+
+    Solid colors are filled by PIL, which is faster at it than NumPy. If
+    NumPy is available, the gradients are all filled in a single vectorized
+    operation; otherwise, each one is created separately with PIL.
+    """
+    from PIL import Image
+
+    # NumPy takes a while to import, so it's only imported for gradients
+    numpy = None
+    if any(":" in color for color in colors):
+        try:
+            import numpy
+        except ImportError:
+            pass
+
+    images = []
+    gradients = []
+    for color in colors:
+        stops = parse_color_spec(color)
+        if len(stops) == 1:
+            image = Image.new("RGBA", mask.size, stops[0])
+            image.putalpha(mask)
+        elif numpy is not None:
+            image = None
+            gradients.append((len(images), stops))
+        else:
+            image = Image.new("RGB", (1, mask.size[1]))
+            image.putdata(gradient_rows(stops, mask.size[1]))
+            image = image.resize(mask.size, Image.NEAREST).convert("RGBA")
+            image.putalpha(mask)
+        images.append(image)
+
+    if not gradients:
+        return images
+
+    # Each pixel is a little-endian 32-bit RGBA value: the color of each row
+    # of each gradient is OR-ed with the alpha of each pixel of the mask
+    width, height = mask.size
+    y = numpy.arange(height, dtype=numpy.float64)
+    rows = numpy.empty((len(gradients), height), "<u4")
+    for i, (index, (top, bottom)) in enumerate(gradients):
+        if height == 1:
+            r, g, b = top
+        else:
+            r, g, b = [(a + (b - a) * y / float(height - 1) + 0.5).astype("<u4")
+                    for a, b in zip(top, bottom)]
+        rows[i] = r | g << 8 | b << 16
+
+    alpha = numpy.frombuffer(mask.tobytes(), numpy.uint8).reshape(height,
+            width).astype("<u4") << 24
+    pixels = alpha[numpy.newaxis] | rows[:, :, numpy.newaxis]
+
+    for i, (index, stops) in enumerate(gradients):
+        images[index] = Image.frombuffer("RGBA", mask.size, pixels[i], "raw",
+                "RGBA", 0, 1)
+    return images
+
+
+def parse_shadow(value):
+    """Parses a DX,DY[,BLUR[,COLOR]] drop shadow specification."""
+    parts = value.split(",", 3)
+    try:
+        dx, dy = int(parts[0]), int(parts[1])
+        blur = float(parts[2]) if len(parts) > 2 else 0
+        color = parts[3].strip() if len(parts) > 3 else "#00000080"
+        from PIL import ImageColor
+        ImageColor.getrgb(color)
+    except (ValueError, IndexError):
+        raise argparse.ArgumentTypeError("invalid shadow: %r" % value)
+    return dx, dy, blur, color
+
+
+class CanvasPool(object):
+    """Transparent RGBA canvases to render icons onto, reused from icon to
+    icon instead of allocating a new image for each.
+
+    The canvases in use and those kept for reuse take at most max_bytes,
+    but one canvas is always available. acquire waits for canvases to be
+    released while there's no room for another, which bounds the number of
+    images in progress.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.in_use = 0
+        self._free = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        """Returns a transparent size x size canvas."""
+        from PIL import Image
+
+        needed = size * size * 4
+        with self._condition:
+            while True:
+                if self._free.get(size):
+                    canvas, box = self._free[size].pop()
+                    break
+
+                # Make room by dropping spare canvases of other sizes
+                for other, canvases in self._free.items():
+                    while canvases and self.bytes + needed > self.max_bytes:
+                        canvases.pop()
+                        self.bytes -= other * other * 4
+
+                if self.bytes + needed <= self.max_bytes or not self.in_use:
+                    self.bytes += needed
+                    canvas = None
+                    break
+                self._condition.wait()
+            self.in_use += 1
+
+        if canvas is None:
+            try:
+                return Image.new("RGBA", (size, size), (0,0,0,0))
+            except Exception:
+                # e.g. MemoryError, give back the room taken for it
+                with self._condition:
+                    self.bytes -= needed
+                    self.in_use -= 1
+                    self._condition.notify_all()
+                raise
+        canvas.paste((0,0,0,0), box)
+        return canvas
+
+    def release(self, canvas, box):
+        """Returns a canvas to the pool. box is the area which was drawn on,
+        cleared before the canvas is used again."""
+        with self._condition:
+            self._free.setdefault(canvas.size[0], []).append((canvas, box))
+            self.in_use -= 1
+            self._condition.notify_all()
+
+
+class Exporter(object):
+    """Renders icons from a font, keeping the loaded fonts and the rendered
+    icon masks between calls.
+
+    Usage:
+
+        exporter = Exporter("fontawesome-webfont.ttf")
+        image = exporter.render("play", 24, "black")
+        data = exporter.render_bytes("stop", 24, "#336699")
+
+    icon_map is a mapping of icon names to characters (by default, the
+    built-in list of icons). A CSS file can be used instead with
+    Exporter(font, LoadCSSAction._load_css("font-awesome.css")).
+
+    compress_level (0-9) and optimize are passed on to the PNG encoder. With
+    reduce_colors, icons are encoded as grayscale or palette images where
+    that makes them smaller, see reduce_single_color.
+
+    With supersample_size, icons smaller than that size aren't rasterized
+    directly -- their masks are downscaled from the mask rendered at
+    supersample_size, so a set of sizes takes a single rasterization.
+
+    Colors can be gradients, see parse_color_spec. shadow is a (dx, dy,
+    blur, color) tuple of a drop shadow to draw under the icons. The colors
+    in batch_colors are recolored together (see recolor_mask) when an icon
+    is first rendered in one of them, which is faster when a lot of
+    gradients are exported.
+
+    If stats is an ExportStats, the time and memory taken by each stage of
+    rendering is recorded in it. Masks are also looked up in and added to
+    mask_store, a MaskStore, if given. Glyph metrics are cached in files in
+    cache_dir, if given (see GlyphMetrics.load), and only in memory
+    otherwise.
+    """
+
+    # Maximum size of the pixels of a batch of recolored images, in bytes
+    BATCH_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, font="fontawesome-webfont.ttf", icon_map=None,
+            fonts=None, masks=None, compress_level=None, optimize=False,
+            reduce_colors=False, supersample_size=None, shadow=None,
+            batch_colors=None, stats=None, mask_store=None, cache_dir=None):
+        self.font = font
+        self.icons = icon_map if icon_map is not None else load_icons()
+        self.font_cache = fonts if fonts is not None else FontCache()
+        self.mask_cache = masks if masks is not None else MaskCache(maxsize=64)
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.reduce_colors = reduce_colors
+        self.supersample_size = supersample_size
+        self.shadow = tuple(shadow) if shadow else None
+        self.batch_colors = list(batch_colors or [])
+        self._batch_index = dict((color, i)
+                for i, color in enumerate(self.batch_colors))
+        self._batch = (None, None, {})
+        self.stats = stats
+        self.mask_store = mask_store
+        self.cache_dir = cache_dir
+
+    def options_key(self):
+        """Returns the options which affect the output files, or None if
+        they're the defaults."""
+        if self.compress_level is None and not self.optimize and \
+                not self.reduce_colors and not self.supersample_size and \
+                not self.shadow:
+            return None
+        return (self.compress_level, self.optimize, self.reduce_colors,
+                self.supersample_size, self.shadow)
+
+    def render_mask(self, icon, size):
+        """Renders the alpha mask of an icon, cropped to its bounding box.
+
+        Returns an (image, (x, y)) tuple, where (x, y) is the position of the
+        cropped mask within the size x size square of the whole icon. The
+        mask doesn't depend on the color, so it's cached and reused for all
+        colors.
+        """
+        if self.supersample_size and size < self.supersample_size:
+            return self._downscale_mask(icon, size)
+
+        char = self.icons[icon]
+        key = (path.abspath(self.font), path.getmtime(self.font), char, size)
+        cached = self.mask_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if self.mask_store:
+            store_key = self.mask_store.key(font_hash(self.font), char, size)
+            stored = self.mask_store.get(store_key)
+            if stored is not None:
+                self.mask_cache.put(key, stored)
+                return stored
+
+        from PIL import Image, ImageDraw
+
+        stats = self.stats
+        if stats:
+            mark = stats.mark()
+
+        # Initialize font
+        font = self.font_cache.load(self.font, size)
+
+        if stats:
+            mark = stats.record("font", mark)
+
+        # Determine the dimensions of the icon
+        width,height = text_size(font, char)
+        x, y = (size - width) / 2, (size - height) / 2
+
+        # Draw the icon once, as an alpha mask. If the glyph metrics are
+        # known, only the area of the size x size square which the glyph
+        # covers is drawn.
+        region = self._glyph_region(char, size, font, x, y)
+        if region:
+            left, top, right, bottom = region
+            imagemask = Image.new("L", (right - left, bottom - top), 0)
+            drawmask = ImageDraw.Draw(imagemask)
+            drawmask.text((x - left, y - top), char, font=font, fill=255)
+
+            # The margin of the area must be empty, unless it's at the edge
+            # of the square -- otherwise the glyph didn't fit
+            bbox = imagemask.getbbox()
+            if not bbox or (bbox[0] == 0 and left > 0) or \
+                    (bbox[1] == 0 and top > 0) or \
+                    (bbox[2] == right - left and right < size) or \
+                    (bbox[3] == bottom - top and bottom < size):
+                region = None
+
+        if not region:
+            imagemask = Image.new("L", (size, size), 0)
+            drawmask = ImageDraw.Draw(imagemask)
+            drawmask.text((x, y), char, font=font, fill=255)
+
+        if stats:
+            mark = stats.record("draw", mark)
+
+        # Get bounding box from the mask itself. A glyph which draws
+        # nothing leaves a single empty pixel in the middle of the icon.
+        bbox = imagemask.getbbox() or (0, 0, 1, 1)
+        imagemask = imagemask.crop(bbox)
+
+        borderw = int((size - (bbox[2] - bbox[0])) / 2)
+        borderh = int((size - (bbox[3] - bbox[1])) / 2)
+
+        if stats:
+            stats.record("bbox", mark)
+
+        if self.mask_store:
+            self.mask_store.put(store_key, imagemask, (borderw, borderh))
+        self.mask_cache.put(key, (imagemask, (borderw, borderh)))
+        return imagemask, (borderw, borderh)
+
+    def glyph_metrics(self, icon):
+        """Returns the (advance, bbox) metrics of an icon's glyph in em units
+        (see GlyphMetrics), or None if they aren't known."""
+        metrics = GlyphMetrics.load(self.font, self.cache_dir)
+        if metrics is None:
+            return None
+        return metrics.glyphs.get(ord(self.icons[icon]))
+
+    def _glyph_region(self, char, size, font, x, y):
+        """Returns the (left, top, right, bottom) area of the size x size
+        square which the glyph of char, drawn at (x, y), covers according to
+        the glyph metrics, with a margin for hinting. Returns None if the
+        metrics aren't known."""
+        metrics = GlyphMetrics.load(self.font, self.cache_dir)
+        glyph = metrics.glyphs.get(ord(char)) if metrics else None
+        if not glyph or not glyph[1]:
+            return None
+
+        x_min, y_min, x_max, y_max = glyph[1]
+        baseline = y + font.getmetrics()[0]
+        margin = 2
+
+        left = int(math.floor(x + x_min * size)) - margin
+        top = int(math.floor(baseline - y_max * size)) - margin
+        right = min(size, int(math.ceil(x + x_max * size)) + margin)
+        bottom = min(size, int(math.ceil(baseline - y_min * size)) + margin)
+
+        # A fractional position is rasterized differently when it becomes
+        # negative, so the area can't start after it
+        if x % 1:
+            left = min(left, int(x))
+        if y % 1:
+            top = min(top, int(y))
+        left, top = max(0, left), max(0, top)
+
+        if left >= right or top >= bottom:
+            return None
+        return left, top, right, bottom
+
+    def _downscale_mask(self, icon, size):
+        """Derives the mask of an icon from its mask at supersample_size,
+        using Lanczos resampling."""
+        base = self.supersample_size
+        key = (path.abspath(self.font), path.getmtime(self.font),
+                self.icons[icon], size, base)
+        cached = self.mask_cache.get(key)
+        if cached is not None:
+            return cached
+
+        from PIL import Image
+
+        basemask, offset = self.render_mask(icon, base)
+
+        stats = self.stats
+        if stats:
+            mark = stats.mark()
+
+        scale = float(size) / base
+        width = max(1, int(round(basemask.size[0] * scale)))
+        height = max(1, int(round(basemask.size[1] * scale)))
+        imagemask = basemask.resize((width, height), Image.LANCZOS)
+
+        # Resampling can leave empty borders
+        bbox = imagemask.getbbox()
+        if bbox:
+            imagemask = imagemask.crop(bbox)
+
+        borderw = int((size - imagemask.size[0]) / 2)
+        borderh = int((size - imagemask.size[1]) / 2)
+
+        if stats:
+            stats.record("downscale", mark)
+
+        self.mask_cache.put(key, (imagemask, (borderw, borderh)))
+        return imagemask, (borderw, borderh)
+
+    def render_glyph(self, icon, size, color="black"):
+        """Renders an icon cropped to its bounding box.
+
+        Returns an (image, (x, y)) tuple, where (x, y) is the position of the
+        cropped image within the size x size square of the whole icon.
+        """
+        if self.shadow:
+            # The shadow extends beyond the glyph
+            image = self.render(icon, size, color)
+            bbox = image.getbbox() or (0, 0, size, size)
+            return image.crop(bbox), bbox[:2]
+
+        imagemask, offset = self.render_mask(icon, size)
+
+        stats = self.stats
+        if stats:
+            mark = stats.mark()
+
+        index = self._batch_index.get(color)
+        if index is None:
+            iconimage = recolor_mask(imagemask, [color])[0]
+            if stats:
+                stats.record("composite", mark)
+            return iconimage, offset
+
+        # Recolor the mask in the batch colors around this one, as many as
+        # fit in BATCH_BYTES
+        width, height = imagemask.size
+        count = max(1, self.BATCH_BYTES // (width * height * 4))
+        start = index - index % count
+        mask, batch_start, images = self._batch
+        if mask is not imagemask or batch_start != start:
+            colors = self.batch_colors[start:start + count]
+            images = dict(zip(colors, recolor_mask(imagemask, colors)))
+            self._batch = (imagemask, start, images)
+
+        if stats:
+            stats.record("composite", mark)
+        return images[color], offset
+
+    def render(self, icon, size, color="black"):
+        """Renders an icon as a size x size RGBA image."""
+        from PIL import Image
+
+        if self.shadow:
+            return self._render_shadowed(icon, size, color)
+
+        if self.stats:
+            mark = self.stats.mark()
+
+        # Create output image
+        outimage = Image.new("RGBA", (size, size), (0,0,0,0))
+
+        if self.stats:
+            self.stats.record("composite", mark)
+
+        self.render_onto(outimage, icon, size, color)
+        return outimage
+
+    def render_onto(self, canvas, icon, size, color="black"):
+        """Renders an icon onto canvas, a transparent size x size RGBA image
+        (e.g. one reused from an earlier icon, see CanvasPool). Returns the
+        (left, top, right, bottom) area which was drawn on."""
+        if self.shadow:
+            canvas.paste(self._render_shadowed(icon, size, color))
+            return (0, 0, size, size)
+
+        if ":" in color or color in self._batch_index:
+            iconimage, (borderw, borderh) = self.render_glyph(icon, size,
+                    color)
+            if self.stats:
+                mark = self.stats.mark()
+            canvas.paste(iconimage, (borderw,borderh))
+            width, height = iconimage.size
+        else:
+            # A solid color is drawn straight through the mask, without
+            # another image: the glyph's box is filled with the color at zero
+            # opacity, so blending in the opaque color by the mask leaves the
+            # color in every pixel and the mask as the alpha
+            imagemask, (borderw, borderh) = self.render_mask(icon, size)
+            if self.stats:
+                mark = self.stats.mark()
+            width, height = imagemask.size
+            box = (borderw, borderh, borderw + width, borderh + height)
+            rgb = tuple(parse_color_spec(color)[0])
+            canvas.paste(rgb + (0,), box)
+            canvas.paste(rgb + (255,), box, imagemask)
+
+        if self.stats:
+            self.stats.record("composite", mark)
+
+        return (borderw, borderh, borderw + width, borderh + height)
+
+    def _render_shadowed(self, icon, size, color):
+        """Renders an icon with a drop shadow. The shadow is clipped to the
+        size x size square of the icon."""
+        from PIL import Image, ImageColor, ImageFilter
+
+        dx, dy, blur, shadow_color = self.shadow
+        imagemask, (borderw, borderh) = self.render_mask(icon, size)
+
+        if self.stats:
+            mark = self.stats.mark()
+
+        shadowmask = Image.new("L", (size, size), 0)
+        shadowmask.paste(imagemask, (borderw + dx, borderh + dy))
+        if blur:
+            shadowmask = shadowmask.filter(ImageFilter.GaussianBlur(blur))
+
+        rgba = ImageColor.getrgb(shadow_color)
+        opacity = rgba[3] if len(rgba) > 3 else 255
+        if opacity < 255:
+            shadowmask = shadowmask.point([level * opacity // 255
+                    for level in range(256)])
+
+        outimage = Image.new("RGBA", (size, size), rgba[:3])
+        outimage.putalpha(shadowmask)
+
+        iconimage = recolor_mask(imagemask, [color])[0]
+        iconlayer = Image.new("RGBA", (size, size), (0,0,0,0))
+        iconlayer.paste(iconimage, (borderw, borderh))
+
+        outimage = Image.alpha_composite(outimage, iconlayer)
+
+        if self.stats:
+            self.stats.record("composite", mark)
+
+        return outimage
+
+    def single_color(self, color):
+        """Returns color if icons rendered in it have no other colors, or
+        None for gradients and shadows."""
+        if self.shadow or ":" in color:
+            return None
+        return color
+
+    def encode(self, image, color=None):
+        """Encodes an image as PNG. color is the only color of the image, if
+        it has one, which allows encoding it in a smaller mode. The reduced
+        image is kept only if it's smaller: a palette with many alpha levels
+        can take more than the RGBA image it replaces, mostly in small
+        sizes."""
+        options = {}
+        if self.compress_level is not None:
+            options["compress_level"] = self.compress_level
+        if self.optimize:
+            options["optimize"] = True
+
+        output = io.BytesIO()
+        image.save(output, format="PNG", **options)
+        data = output.getvalue()
+
+        if self.reduce_colors and color is not None:
+            reduced, reduced_options = reduce_single_color(image, color)
+            reduced_options.update(options)
+            output = io.BytesIO()
+            reduced.save(output, format="PNG", **reduced_options)
+            if len(output.getvalue()) < len(data):
+                data = output.getvalue()
+        return data
+
+    def render_bytes(self, icon, size, color="black"):
+        """Renders an icon and returns it encoded as PNG."""
+        return self.encode(self.render(icon, size, color),
+                self.single_color(color))
+
+    def render_encoded(self, icon, size, color="black"):
+        """Renders an icon and encodes it as PNG.
+
+        Returns a (data, seconds) tuple of the encoded image and the time it
+        took to encode.
+        """
+        image = self.render(icon, size, color)
+
+        if self.stats:
+            mark = self.stats.mark()
+
+        start = time.time()
+        data = self.encode(image, self.single_color(color))
+        elapsed = time.time() - start
+
+        if self.stats:
+            self.stats.record("encode", mark)
+        return data, elapsed
+
+    def render_svg(self, icon, color="black"):
+        """Returns an icon as an SVG document, drawn from its glyph's outline
+        (see GlyphOutlines) and centered in a square of the font's em size,
+        as in the rendered images. Raises ValueError if the outlines of the
+        font can't be read."""
+        outlines = GlyphOutlines.load(self.font)
+        code = ord(self.icons[icon])
+        stops = ["#%02x%02x%02x" % stop for stop in parse_color_spec(color)]
+
+        defs = fill = ""
+        if len(stops) > 1:
+            # The id must be unique within a page which inlines several
+            # icons -- an id shared by two copies of an icon in the same
+            # colors refers to identical gradients
+            gradient = "fa-%s-%s-%s" % (icon, stops[0][1:], stops[1][1:])
+            defs = ('<defs><linearGradient id="%s" x2="0" y2="1">'
+                    '<stop stop-color="%s"/><stop offset="1" stop-color="%s"/>'
+                    '</linearGradient></defs>' % ((gradient,) + tuple(stops)))
+            fill = ' fill="url(#%s)"' % gradient
+        elif stops[0] != "#000000":
+            fill = ' fill="%s"' % stops[0]
+
+        return ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="%s">%s'
+                '<path%s d="%s"/></svg>\n' % (outlines.view_box(code), defs,
+                fill, outlines.glyphs.get(code, ("", None))[0])).encode("ascii")
+
+    def export(self, icon, size, filename, color="black"):
+        """Renders an icon and saves it as filename.
+
+        Returns a (size, seconds) tuple of the encoded file's size in bytes
+        and the time it took to encode.
+        """
+        if self.stats:
+            self.stats.begin(filename)
+
+        data, elapsed = self.render_encoded(icon, size, color)
+
+        if self.stats:
+            mark = self.stats.mark()
+
+        with open(filename, "wb") as f:
+            f.write(data)
+
+        if self.stats:
+            self.stats.record("write", mark)
+
+        return len(data), elapsed
+
+    def export_many(self, icons, sizes=(16,), colors=("black",), prefix="",
+            link="copy"):
+        """Exports icons in all the combinations of sizes and colors, naming
+        the files the way the command line does for multiple icons.
+
+        Aliases which share a glyph are rendered once, see export_group.
+        Returns the list of exported filenames.
+        """
+        exports = [(icon, size, variant_filename(prefix + icon + ".png", size,
+                color, sizes, colors), self.font, color)
+                for icon in icons
+                for size in sizes
+                for color in colors]
+
+        for group in group_exports(exports, self.icons):
+            export_group(group, link, self)
+
+        return [export[2] for export in exports]
+
+
+def _exporter(font):
+    """Returns an Exporter for the current icon mapping, sharing the
+    module-level font and mask caches."""
+    return Exporter(font, load_icons(), font_cache, mask_cache)
+
+
+def render_mask(icon, size, font):
+    return _exporter(font).render_mask(icon, size)
+
+
+def render_glyph(icon, size, font, color):
+    return _exporter(font).render_glyph(icon, size, color)
+
+
+def render_icon(icon, size, font, color):
+    return _exporter(font).render(icon, size, color)
+
+
+def export_icon(icon, size, filename, font, color):
+    _exporter(font).export(icon, size, filename, color)
+
+
+class SkylinePacker(object):
+    """Packs rectangles into a strip of fixed width, using the skyline
+    bottom-left heuristic.
+
+    The skyline is a list of (x, y, width) segments describing the top edge
+    of the rectangles placed so far. Each new rectangle goes to the position
+    where its top edge ends up the lowest, leftmost on ties.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.height = 0
+        self.skyline = [(0, 0, width)]
+
+    def _fit(self, index, width):
+        """Returns the y coordinate at which a rectangle of the given width
+        would be placed at the start of skyline segment index, or None if it
+        doesn't fit."""
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+
+        y = 0
+        remaining = width
+        while remaining > 0:
+            y = max(y, self.skyline[index][1])
+            remaining -= self.skyline[index][2]
+            index += 1
+        return y
+
+    def insert(self, width, height):
+        """Places a rectangle and returns its (x, y) position."""
+        best = None
+        for index in range(len(self.skyline)):
+            y = self._fit(index, width)
+            if y is not None and (best is None or y + height < best[0]):
+                best = (y + height, index, y)
+
+        if best is None:
+            raise ValueError("Rectangle %ix%i is wider than the strip (%i)"
+                    % (width, height, self.width))
+
+        bottom, index, y = best
+        x = self.skyline[index][0]
+
+        # Replace the covered segments with the top edge of the new rectangle
+        segments = [(x, bottom, width)]
+        for seg_x, seg_y, seg_width in self.skyline[index:]:
+            if seg_x + seg_width > x + width:
+                if seg_x < x + width:
+                    seg_width -= x + width - seg_x
+                    seg_x = x + width
+                segments.append((seg_x, seg_y, seg_width))
+        self.skyline[index:] = segments
+
+        # Merge neighboring segments at the same height
+        merged = []
+        for segment in self.skyline:
+            if merged and merged[-1][1] == segment[1]:
+                merged[-1] = (merged[-1][0], segment[1],
+                        merged[-1][2] + segment[2])
+            else:
+                merged.append(segment)
+        self.skyline = merged
+
+        self.height = max(self.height, bottom)
+        return x, y
+
+
+def pack_rectangles(sizes, padding=0):
+    """Packs rectangles into an atlas of roughly square proportions.
+
+    sizes is a list of (width, height) tuples. Returns a (positions, width,
+    height) tuple, where positions is a list of (x, y) tuples in the order
+    of sizes.
+    """
+    padded = [(width + padding, height + padding) for width, height in sizes]
+
+    area = sum(width * height for width, height in padded)
+    strip = max([int(math.ceil(math.sqrt(area)))] +
+            [width for width, height in padded])
+    packer = SkylinePacker(strip)
+
+    # Placing the tallest rectangles first leaves the least wasted space
+    order = sorted(range(len(padded)),
+            key=lambda i: (-padded[i][1], -padded[i][0]))
+    positions = [None] * len(padded)
+    for i in order:
+        positions[i] = packer.insert(*padded[i])
+
+    width = max([x + w for (x, y), (w, h) in zip(positions, sizes)] or [0])
+    height = max([y + h for (x, y), (w, h) in zip(positions, sizes)] or [0])
+    return positions, width, height
+
+
+def _css_length(pixels):
+    """Formats a length in pixels for CSS, "0" without a unit."""
+    return "%ipx" % pixels if pixels else "0"
+
+
+def export_sprite(variants, filename, index_filename, exporter, padding=0):
+    """Exports icons packed into a single sprite image, along with an index
+    of their positions (in JSON or CSS format, depending on the extension of
+    index_filename).
+
+    variants is a list of (name, icon, size, color) tuples, where name is
+    the key of the icon in the index.
+    """
+    from PIL import Image
+
+    glyphs = []
+    for name, icon, size, color in variants:
+        if exporter.stats:
+            exporter.stats.begin(name)
+        glyphs.append(exporter.render_glyph(icon, size, color))
+    positions, width, height = pack_rectangles(
+            [image.size for image, offset in glyphs], padding)
+
+    sprite = Image.new("RGBA", (max(width, 1), max(height, 1)), (0,0,0,0))
+    entries = OrderedDict()
+    for (name, icon, size, color), (image, offset), position in zip(variants,
+            glyphs, positions):
+        sprite.paste(image, position)
+        entries[name] = OrderedDict([
+            ("x", position[0]), ("y", position[1]),
+            ("width", image.size[0]), ("height", image.size[1]),
+            ("size", size),
+            ("offset_x", offset[0]), ("offset_y", offset[1]),
+        ])
+
+    if exporter.stats:
+        exporter.stats.begin(filename)
+        mark = exporter.stats.mark()
+
+    data = exporter.encode(sprite)
+
+    if exporter.stats:
+        mark = exporter.stats.record("encode", mark)
+
+    with open(filename, "wb") as f:
+        f.write(data)
+
+    if exporter.stats:
+        exporter.stats.record("write", mark)
+
+    with open(index_filename, "w") as f:
+        if index_filename.endswith(".css"):
+            image_url = path.basename(filename)
+            for icon, entry in entries.items():
+                # The margins pad the icon back to its full size
+                f.write(".fa-%s { background: url(%s) %s %s; "
+                        "width: %s; height: %s; margin: %s %s %s %s; }\n" %
+                        ((icon, image_url) + tuple(_css_length(pixels)
+                        for pixels in [-entry["x"], -entry["y"],
+                        entry["width"], entry["height"], entry["offset_y"],
+                        entry["size"] - entry["width"] - entry["offset_x"],
+                        entry["size"] - entry["height"] - entry["offset_y"],
+                        entry["offset_x"]])))
+        else:
+            json.dump(OrderedDict([
+                ("image", path.basename(filename)),
+                ("width", sprite.size[0]), ("height", sprite.size[1]),
+                ("icons", entries),
+            ]), f, indent=2)
+            f.write("\n")
+
+    return sprite
+
+
+def export_svg_sprite(icons, filename, exporter):
+    """Exports icons as the symbols of a single SVG file, with the icon
+    names as their ids. The symbols have no fill of their own, so they
+    take the color of the elements which use them."""
+    outlines = GlyphOutlines.load(exporter.font)
+
+    symbols = []
+    for icon in icons:
+        code = ord(exporter.icons[icon])
+        symbols.append('<symbol id="%s" viewBox="%s"><path d="%s"/></symbol>'
+                % (icon, outlines.view_box(code),
+                outlines.glyphs.get(code, ("", None))[0]))
+
+    data = ('<svg xmlns="http://www.w3.org/2000/svg">\n%s\n</svg>\n' %
+            "\n".join(symbols)).encode("ascii")
+    with open(filename, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def replace_file(source, target):
+    """Renames source to target, replacing target atomically where the
+    system allows it."""
+    if hasattr(os, "replace"):
+        os.replace(source, target)
+    else:
+        # Python 2 can't rename over an existing file on Windows
+        if os.name == "nt" and path.lexists(target):
+            os.remove(target)
+        os.rename(source, target)
+
+
+def link_file(source, target, method="copy"):
+    """Creates target as a copy, hard link or symbolic link of source. The
+    link is created under a temporary name and renamed into place."""
+    tmp_filename = "%s.%i.tmp" % (target, os.getpid())
+    if path.lexists(tmp_filename):
+        os.remove(tmp_filename)
+
+    try:
+        if method == "hardlink":
+            os.link(source, tmp_filename)
+        elif method == "symlink":
+            os.symlink(path.relpath(source, path.dirname(target) or "."),
+                    tmp_filename)
+        else:
+            shutil.copyfile(source, tmp_filename)
+        replace_file(tmp_filename, target)
+    finally:
+        if path.lexists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+class FileWriter(object):
+    """Writes exported images as files. With make_dirs, missing directories
+    are created.
+
+    Each file is written under a temporary name and renamed into place, so
+    it's never seen half-written, and a file left by a previous run is
+    replaced rather than written through (it may be a link to another
+    icon).
+
+    With sync_batch, the written files and then their directories are
+    flushed to disk (fsync) in batches of that many files, and once more on
+    close. The files which fail to flush are added to errors, as (filename,
+    error) tuples.
+    """
+
+    def __init__(self, make_dirs=False, sync_batch=0):
+        self.make_dirs = make_dirs
+        self.sync_batch = sync_batch
+        self.errors = []
+        self._unsynced = []
+
+    def write(self, filename, data):
+        if self.make_dirs and path.dirname(filename) and \
+                not path.isdir(path.dirname(filename)):
+            os.makedirs(path.dirname(filename))
+
+        tmp_filename = "%s.%i.tmp" % (filename, os.getpid())
+        try:
+            with open(tmp_filename, "wb") as f:
+                f.write(data)
+            replace_file(tmp_filename, filename)
+        finally:
+            if path.exists(tmp_filename):
+                os.remove(tmp_filename)
+        self._written(filename)
+
+    def link(self, source, target, method="copy"):
+        link_file(source, target, method)
+        self._written(target)
+
+    def _written(self, filename):
+        if self.sync_batch:
+            self._unsynced.append(filename)
+            if len(self._unsynced) >= self.sync_batch:
+                self.sync()
+
+    def sync(self):
+        """Flushes the files written since the last call to disk, followed
+        by their directories."""
+        directories = set()
+        for filename in self._unsynced:
+            try:
+                fd = os.open(filename, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                self.errors.append((filename,
+                        "%s: %s" % (type(e).__name__, e)))
+            directories.add(path.dirname(filename) or ".")
+        self._unsynced = []
+
+        for directory in directories:
+            # Directories can't be opened on some systems, e.g. Windows
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+    def close(self):
+        self.sync()
+
+
+class ArchiveWriter(object):
+    """Writes exported images into a zip or tar archive, straight from
+    memory, without temporary files.
+
+    The archive is streamed, so it can be written to a pipe -- filename "-"
+    is the standard output. The format is "zip", "tar", "tar.gz" or
+    "tar.bz2", by default guessed from the file name, including the ".tgz"
+    and ".tbz2" extensions (and "tar" for the standard output).
+    """
+
+    def __init__(self, filename, format=None):
+        if filename == "-":
+            fileobj = getattr(sys.stdout, "buffer", sys.stdout)
+        else:
+            fileobj = open(filename, "wb")
+        self.fileobj = fileobj
+
+        if format is None:
+            for extension, format in ((".zip", "zip"), (".tar.gz", "tar.gz"),
+                    (".tgz", "tar.gz"), (".tar.bz2", "tar.bz2"),
+                    (".tbz2", "tar.bz2"), (".tar", "tar")):
+                if filename.endswith(extension):
+                    break
+            else:
+                format = "tar"
+
+        self.format = format
+        self.last = (None, None)
+        if format == "zip":
+            import zipfile
+            # PNG data is already compressed
+            self.archive = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED)
+        else:
+            import tarfile
+            self.archive = tarfile.open(mode="w|" + format[4:],
+                    fileobj=fileobj)
+
+    def _add(self, filename, data):
+        import tarfile, zipfile
+
+        if self.format == "zip":
+            info = zipfile.ZipInfo(filename, time.localtime()[:6])
+            info.external_attr = 0o644 << 16
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(filename)
+            info.size = len(data)
+            info.mtime = time.time()
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def write(self, filename, data):
+        self._add(filename, data)
+
+        # Only the last file is kept, as aliases are linked right after the
+        # file they're linked to
+        self.last = (filename, data)
+
+    def link(self, source, target, method="copy"):
+        if self.format == "zip" or method == "copy":
+            # Zip files can't hold links
+            if self.last[0] != source:
+                raise ValueError("Can only link to the last written file")
+            self._add(target, self.last[1])
+            return
+
+        import tarfile
+        info = tarfile.TarInfo(target)
+        info.mtime = time.time()
+        if method == "hardlink":
+            info.type = tarfile.LNKTYPE
+            info.linkname = source
+        else:
+            info.type = tarfile.SYMTYPE
+            info.linkname = path.relpath(source, path.dirname(target) or ".")
+        self.archive.addfile(info)
+
+    def close(self):
+        self.archive.close()
+        if self.fileobj is not getattr(sys.stdout, "buffer", sys.stdout):
+            self.fileobj.close()
+        else:
+            self.fileobj.flush()
+
+
+class BufferWriter(object):
+    """Records the files written by an export worker, to be replayed by the
+    main process into a writer which can't be shared, like an archive."""
+
+    def __init__(self):
+        self.operations = []
+
+    def write(self, filename, data):
+        self.operations.append(("write", filename, data))
+
+    def link(self, source, target, method="copy"):
+        self.operations.append(("link", source, target, method))
+
+    def replay(self, writer):
+        for operation in self.operations:
+            getattr(writer, operation[0])(*operation[1:])
+        self.operations = []
+
+
+def group_exports(exports, icon_map=None):
+    """Groups exports which result in identical images -- aliases sharing a
+    codepoint, in the same size and color.
+
+    exports is a list of (icon, size, filename, font, color) tuples. Returns
+    a list of groups (lists of exports), in the order of their first export.
+    """
+    icon_map = icon_map if icon_map is not None else load_icons()
+    groups = OrderedDict()
+    for export in exports:
+        icon, size, filename, font, color = export
+        groups.setdefault((icon_map[icon], size, font, color),
+                []).append(export)
+    return list(groups.values())
+
+
+def export_group(group, link="copy", exporter=None, writer=None):
+    """Exports a group of icons which result in identical images. The image
+    is rendered and written once, as the first file of the group, and the
+    other files are linked to it (see link_file).
+
+    writer is a FileWriter (the default) or an ArchiveWriter. Returns a
+    (size, seconds) tuple of the encoded image's size in bytes and the time
+    it took to encode.
+    """
+    icon, size, filename, font, color = group[0]
+    writer = writer or FileWriter()
+    exporter = exporter or _exporter(font)
+
+    stats = exporter.stats
+    if stats:
+        stats.begin(filename)
+
+    data, elapsed = exporter.render_encoded(icon, size, color)
+
+    if stats:
+        mark = stats.mark()
+
+    writer.write(filename, data)
+
+    for export in group[1:]:
+        writer.link(filename, export[2], link)
+
+    if stats:
+        stats.record("write", mark)
+
+    return len(data), elapsed
+
+
+def export_pipeline(groups, exporter, writer=None, link="copy", pool=None,
+        threads=2):
+    """Exports groups of icons (see group_exports) through a pipeline of
+    threads: the icons are rendered by the calling thread onto canvases from
+    pool, a CanvasPool, encoded by a number of threads, and written by one
+    thread, in the original order.
+
+    An icon's canvas returns to the pool once its image is passed on to the
+    writer, so when the writer falls behind, encoding waits, and when the
+    pool has no room for another canvas, rendering waits -- the memory taken
+    by images stays bounded by the pool's size.
+
+    Yields a (group, error, encoded, None, stages) tuple for each group as
+    it's written, as export_icons_parallel does, where stages are the
+    encoding and writing times of the group's image if the exporter records
+    stats.
+    """
+    writer = writer or FileWriter()
+    pool = pool or CanvasPool()
+    rendered = queue.Queue()
+    encoded = queue.Queue(threads * 2)
+    written = queue.Queue()
+
+    def encode():
+        for index, group, canvas, box in iter(rendered.get, None):
+            try:
+                start = time.time()
+                data = exporter.encode(canvas,
+                        exporter.single_color(group[0][4]))
+                item = (index, group, data, time.time() - start, None)
+            except Exception as e:
+                item = (index, group, None, None,
+                        "%s: %s" % (type(e).__name__, e))
+            encoded.put(item)
+            pool.release(canvas, box)
+        encoded.put(None)
+
+    def write():
+        # Images encoded ahead of an earlier one wait for it, so the files
+        # are written (e.g. into an archive) in the same order on every run
+        pending = {}
+        next_index = 0
+        finished = 0
+        while finished < threads:
+            item = encoded.get()
+            if item is None:
+                finished += 1
+                continue
+            pending[item[0]] = item[1:]
+            while next_index in pending:
+                write_group(*pending.pop(next_index))
+                next_index += 1
+        written.put(None)
+
+    def write_group(group, data, elapsed, error):
+        start = time.time()
+        if error is None:
+            try:
+                writer.write(group[0][2], data)
+                for export in group[1:]:
+                    writer.link(group[0][2], export[2], link)
+            except Exception as e:
+                error = "%s: %s" % (type(e).__name__, e)
+
+        if error is None:
+            stages = exporter.stats and OrderedDict([
+                ("encode", [elapsed, 0]),
+                ("write", [time.time() - start, 0])])
+            written.put((group, None, (len(data), elapsed), None,
+                    stages or None))
+        else:
+            written.put((group, error, None, None, None))
+
+    stages = [threading.Thread(target=encode) for i in range(threads)] + \
+            [threading.Thread(target=write)]
+    for stage in stages:
+        stage.daemon = True
+        stage.start()
+
+    try:
+        for index, group in enumerate(groups):
+            icon, size, filename, font, color = group[0]
+            if exporter.stats:
+                exporter.stats.begin(filename)
+
+            canvas = None
+            try:
+                canvas = pool.acquire(size)
+                box = exporter.render_onto(canvas, icon, size, color)
+            except Exception as e:
+                if canvas is not None:
+                    pool.release(canvas, (0, 0, size, size))
+                encoded.put((index, group, None, None,
+                        "%s: %s" % (type(e).__name__, e)))
+            else:
+                rendered.put((index, group, canvas, box))
+
+            # Pass on the groups written so far
+            while True:
+                try:
+                    item = written.get_nowait()
+                except queue.Empty:
+                    break
+                yield item
+    finally:
+        for i in range(threads):
+            rendered.put(None)
+
+    for item in iter(written.get, None):
+        yield item
+
+
+# Exporter of the current export worker process
+_worker_exporter = None
+
+
+def _init_export_worker(icon_map, font, sizes, options, stats=False):
+    global icons, _worker_exporter
+    icons = icon_map
+    _worker_exporter = Exporter(font, icon_map, font_cache, mask_cache,
+            stats=ExportStats() if stats else None, **options)
+
+    # Load the fonts up front, so each worker process does it only once
+    for size in sizes:
+        font_cache.load(font, size)
+
+
+def _export_batch(args):
+    """Exports a batch of export groups in a worker process.
+
+    Returns a list of (group, error, encoded, buffer, stages) tuples, where
+    error is None for groups which were exported successfully, encoded is
+    the result of export_group, buffer is a BufferWriter holding the files
+    if buffered is set, or None if they were written directly, and stages
+    are the group's stages recorded by the worker's ExportStats, if any.
+    Files written directly are flushed to disk in batches of sync_batch
+    (see FileWriter), and a group fails if one of its files can't be.
+    """
+    batch, link, buffered, sync_batch = args
+    stats = _worker_exporter.stats
+    file_writer = None if buffered else FileWriter(sync_batch=sync_batch)
+    results = []
+    for group in batch:
+        writer = BufferWriter() if buffered else file_writer
+        try:
+            encoded = export_group(group, link, _worker_exporter, writer)
+        except Exception as e:
+            error, encoded = "%s: %s" % (type(e).__name__, e), None
+        else:
+            error = None
+        stages = stats.images.pop(group[0][2], None) if stats else None
+        results.append((group, error, encoded,
+                writer if buffered and not error else None, stages))
+
+    if file_writer:
+        file_writer.close()
+        failed = dict(file_writer.errors)
+        for i, (group, error, encoded, buffer, stages) in enumerate(results):
+            errors = [failed[export[2]] for export in group
+                    if export[2] in failed]
+            if errors and not error:
+                results[i] = (group, errors[0], None, None, None)
+    return results
+
+
+def export_icons_parallel(groups, jobs, font, sizes, link="copy",
+        options=None, buffered=False, stats=False, sync_batch=0):
+    """Exports icons using a pool of worker processes.
+
+    groups is a list of export groups, as returned by group_exports, split
+    into batches which are sent to the workers. options are the keyword
+    arguments for the workers' Exporter. With buffered, the workers send
+    the encoded images back instead of writing files, and otherwise they
+    flush the files to disk in batches of sync_batch. With stats, the
+    workers record the stages of exporting each group. Yields a (group,
+    error, encoded, buffer, stages) tuple for every group, in the original
+    order.
+    """
+    if options is None:
+        options = {}
+    batch_size = max(1, len(groups) // (jobs * 4))
+    batches = [(groups[i:i + batch_size], link, buffered, sync_batch)
+            for i in range(0, len(groups), batch_size)]
+
+    import multiprocessing
+    pool = multiprocessing.Pool(jobs, _init_export_worker,
+            (load_icons(), font, sizes, options, stats))
+    try:
+        for results in pool.imap(_export_batch, batches):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# Fields of a job line, in the order of CSV job lines
+JOB_FIELDS = ["icon", "size", "color", "output"]
+
+# Largest icon size of a job line, a canvas of 256 MB
+MAX_JOB_SIZE = 8192
+
+
+def parse_job(line, defaults):
+    """Parses a job line: a JSON object with "icon", "size", "color" and
+    "output" keys, or comma-separated values of those fields in that order.
+
+    Missing fields are taken from the defaults dictionary. Returns a
+    dictionary of the fields, with the size converted to an integer. Raises
+    ValueError if the line is invalid, or the size is above MAX_JOB_SIZE.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        fields = json.loads(line)
+        if not isinstance(fields, dict):
+            raise ValueError("not a JSON object")
+    else:
+        fields = dict(zip(JOB_FIELDS, next(csv.reader([line]))))
+
+    job = dict(defaults)
+    job.update((key, value) for key, value in fields.items()
+            if key in JOB_FIELDS and value not in (None, ""))
+
+    if not job.get("icon"):
+        raise ValueError("no icon")
+    for field in ("icon", "color", "output"):
+        # Both str and unicode on Python 2
+        if field in job and not isinstance(job[field], (str, type(u("")))):
+            raise ValueError("invalid %s: %r" % (field, job[field]))
+    if isinstance(job["size"], bool):
+        raise ValueError("invalid size: %r" % job["size"])
+    try:
+        job["size"] = int(job["size"])
+    except (ValueError, TypeError):
+        raise ValueError("invalid size: %r" % job["size"])
+    if not 0 < job["size"] <= MAX_JOB_SIZE:
+        raise ValueError("invalid size: %r" % job["size"])
+    job["color"] = job["color"].strip()
+
+    # Strip the "icon-" prefix, if present
+    if job["icon"].startswith("icon-"):
+        job["icon"] = job["icon"][5:]
+    if not job.get("output"):
+        job["output"] = job.get("prefix", "") + job["icon"] + ".png"
+    job.pop("prefix", None)
+
+    return job
+
+
+def export_stream(lines, exporter, writer, out, defaults, threads=2,
+        queue_size=64, pool=None):
+    """Exports icons as described by job lines (see parse_job), as they're
+    read.
+
+    The jobs go through a pipeline of threads connected by bounded queues:
+    the lines are parsed by one thread, the icons are rendered by the
+    calling thread (so fonts and masks are reused from the exporter's
+    caches), encoded by a number of threads, and written by one thread. A
+    stage which falls behind makes the previous stages wait, so the number
+    of jobs in progress stays bounded. The icons are rendered onto canvases
+    from pool, a CanvasPool, which also bounds the memory they take.
+
+    The result of each job is written to out as a line of JSON, with the
+    number of the job's line and either its fields, "status": "ok", the size
+    of the image in bytes and the encoding time, or "status": "error" and
+    the error. Blank lines and lines starting with "#" are skipped. Returns
+    a (jobs, errors) tuple of the number of jobs and failed jobs.
+    """
+    pool = pool or CanvasPool()
+    parsed = queue.Queue(queue_size)
+    rendered = queue.Queue(queue_size)
+    encoded = queue.Queue(queue_size)
+    counts = [0, 0]
+
+    def read():
+        try:
+            for number, line in enumerate(lines, 1):
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                # A bad line must not stop the jobs after it
+                try:
+                    job, error = parse_job(line, defaults), None
+                except Exception as e:
+                    job, error = None, "invalid job: %s" % e
+                parsed.put((number, job, error))
+        finally:
+            parsed.put(None)
+
+    def encode():
+        for item in iter(rendered.get, None):
+            number, job, canvas, box = item
+            try:
+                start = time.time()
+                data = exporter.encode(canvas,
+                        exporter.single_color(job["color"]))
+                item = (number, job, data, time.time() - start, None)
+            except Exception as e:
+                item = (number, job, None, None,
+                        "%s: %s" % (type(e).__name__, e))
+            encoded.put(item)
+            pool.release(canvas, box)
+        encoded.put(None)
+
+    def write():
+        finished = 0
+        while finished < threads:
+            item = encoded.get()
+            if item is None:
+                finished += 1
+                continue
+
+            number, job, data, elapsed, error = item
+            result = OrderedDict([("line", number)])
+            for field in JOB_FIELDS:
+                if job and field in job:
+                    result[field] = job[field]
+
+            if error is None:
+                try:
+                    writer.write(job["output"], data)
+                except Exception as e:
+                    error = "%s: %s" % (type(e).__name__, e)
+
+            counts[0] += 1
+            if error is None:
+                result["status"] = "ok"
+                result["bytes"] = len(data)
+                result["ms"] = round(elapsed * 1000, 3)
+            else:
+                counts[1] += 1
+                result["status"] = "error"
+                result["error"] = error
+
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    stages = [threading.Thread(target=read)] + \
+            [threading.Thread(target=encode) for i in range(threads)] + \
+            [threading.Thread(target=write)]
+    for stage in stages:
+        stage.daemon = True
+        stage.start()
+
+    try:
+        for item in iter(parsed.get, None):
+            number, job, error = item
+            if error is None and job["icon"] not in exporter.icons:
+                error = "unknown icon name: %s" % job["icon"]
+
+            if error is None:
+                if exporter.stats:
+                    exporter.stats.begin(job["output"])
+                canvas = None
+                try:
+                    canvas = pool.acquire(job["size"])
+                    box = exporter.render_onto(canvas, job["icon"],
+                            job["size"], job["color"])
+                except Exception as e:
+                    if canvas is not None:
+                        pool.release(canvas,
+                                (0, 0, job["size"], job["size"]))
+                    error = "%s: %s" % (type(e).__name__, e)
+                else:
+                    rendered.put((number, job, canvas, box))
+                    continue
+
+            # Jobs which failed go straight to the writer
+            encoded.put((number, job, None, None, error))
+    finally:
+        for i in range(threads):
+            rendered.put(None)
+        for stage in stages[1:]:
+            stage.join()
+
+    return tuple(counts)
+
+
+def file_hash(filename):
+    """Returns the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Hashes of the fonts used, keyed by font path, mtime and size
+font_hashes = LRUCache(maxsize=16)
+
+
+def font_hash(filename):
+    """Returns file_hash of a font file, hashing it only once while it's
+    unchanged."""
+    key = (path.abspath(filename), path.getmtime(filename),
+            path.getsize(filename))
+    digest = font_hashes.get(key)
+    if digest is None:
+        digest = file_hash(filename)
+        font_hashes.put(key, digest)
+    return digest
+
+
+def render_key(font_hash, char, size, color, options=None):
+    """Returns a key identifying the rendered image of an icon character,
+    derived from everything that affects its contents. options is the
+    result of Exporter.options_key, possibly along with other options which
+    affect the output file."""
+    key = (font_hash, ord(char), size, color, RENDERER_VERSION)
+    if options is not None:
+        key += (options,)
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class Manifest(object):
+    """A record of exported files and the render keys they were created with,
+    stored as JSON. Used to skip icons whose output is already up to date.
+    """
+
+    FILENAME = ".font-awesome-to-png.json"
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = {}
+
+        try:
+            with open(filename) as f:
+                self.files = json.load(f).get("files", {})
+        except (IOError, ValueError):
+            # Missing or corrupted -- start from scratch
+            pass
+
+    def is_current(self, filename, key):
+        """Checks if the file exists and was exported with the given key, and
+        hasn't been modified since."""
+        entry = self.files.get(filename)
+        if not entry or entry["key"] != key:
+            return False
+
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+
+        return (entry["mtime"] == stat.st_mtime and
+                entry["size"] == stat.st_size)
+
+    def update(self, filename, key):
+        stat = os.stat(filename)
+        self.files[filename] = {"key": key, "mtime": stat.st_mtime,
+                "size": stat.st_size}
+
+    def save(self):
+        # Write to a temporary file first, so an interrupted run doesn't
+        # leave a truncated manifest behind
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump({"version": 1, "files": self.files}, f, indent=0,
+                    sort_keys=True)
+        replace_file(tmp_filename, self.filename)
+
+
+# Largest icon size which the HTTP server renders
+MAX_SERVE_SIZE = 2048
+
+# Exporter of the current icon server worker thread
+_worker_local = threading.local()
+
+
+class IconServer(object):
+    """Renders icons on demand for IconRequestHandler.
+
+    Encoded PNG images are kept in an in-memory LRU cache and, optionally, in
+    a directory on disk. Icons missing from both are rendered by a pool of
+    worker threads, each with its own Exporter, as font objects can't be
+    shared between threads.
+
+    The files in the directory are limited to cache_dir_size bytes: when
+    they grow beyond it, the least recently used ones (by modification
+    time, which is updated when a file is read) are removed until they take
+    three quarters of it.
+    """
+
+    def __init__(self, font, icon_map, cache_size=1024, cache_dir=None,
+            workers=4, options=None, cache_dir_size=256 * 1024 * 1024):
+        if options is None:
+            options = {}
+        self.font = font
+        self.icons = icon_map
+        self.options = options
+        self.options_key = Exporter(font, icon_map, **options).options_key()
+        self.font_hash = file_hash(font)
+        self.cache = LRUCache(cache_size)
+        self.cache_dir = cache_dir
+        self.cache_dir_size = cache_dir_size
+        self.cache_dir_used = sum(size
+                for mtime, size, filename in self._cache_files())
+        self.lock = threading.Lock()
+        self.disk_hits = 0
+        self.renders = 0
+        self.render_time = 0.0
+
+        from multiprocessing.pool import ThreadPool
+        self.pool = ThreadPool(workers, self._init_worker)
+
+    def _init_worker(self):
+        _worker_local.exporter = Exporter(self.font, self.icons,
+                **self.options)
+
+    @staticmethod
+    def _render(icon, size, color):
+        start = time.time()
+        data = _worker_local.exporter.render_bytes(icon, size, color)
+        return data, time.time() - start
+
+    def key(self, icon, size, color):
+        """Returns the key of an icon's image, usable as an ETag. Colors are
+        made canonical first, so e.g. "red" and "#FF0000" share a key."""
+        return render_key(self.font_hash, self.icons[icon], size,
+                canonical_color(color), self.options_key)
+
+    def _cache_files(self):
+        """Returns a list of the (mtime, size, filename) of the icons in the
+        cache directory."""
+        files = []
+        try:
+            names = os.listdir(self.cache_dir) if self.cache_dir else []
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith(".png"):
+                continue
+            filename = path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, filename))
+        return files
+
+    def _trim_cache_dir(self):
+        """Removes the least recently used icons from the cache directory
+        until they take three quarters of cache_dir_size, and returns the
+        size of the remaining ones. Must be called with the lock held."""
+        files = sorted(self._cache_files())
+        used = sum(size for mtime, size, filename in files)
+        for mtime, size, filename in files:
+            if used <= self.cache_dir_size * 3 // 4:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            used -= size
+        return used
+
+    def get(self, icon, size, color):
+        """Returns the (key, data) of an icon encoded as PNG."""
+        key = self.key(icon, size, color)
+
+        with self.lock:
+            data = self.cache.get(key)
+        if data is not None:
+            return key, data
+
+        if self.cache_dir:
+            cache_filename = path.join(self.cache_dir, key + ".png")
+            try:
+                with open(cache_filename, "rb") as f:
+                    data = f.read()
+                # Marks the file as recently used
+                os.utime(cache_filename, None)
+                with self.lock:
+                    self.disk_hits += 1
+            except (IOError, OSError):
+                pass
+
+        if data is None:
+            data, elapsed = self.pool.apply(self._render, (icon, size, color))
+            with self.lock:
+                self.renders += 1
+                self.render_time += elapsed
+
+            if self.cache_dir:
+                write_cache_file(cache_filename, data)
+                with self.lock:
+                    self.cache_dir_used += len(data)
+                    if self.cache_dir_used > self.cache_dir_size:
+                        self.cache_dir_used = self._trim_cache_dir()
+
+        with self.lock:
+            self.cache.put(key, data)
+        return key, data
+
+    def stats(self):
+        with self.lock:
+            stats = self.cache.stats()
+            requests = stats["hits"] + stats["misses"]
+            stats.update({
+                "hit_rate": float(stats["hits"]) / requests if requests else 0,
+                "disk_hits": self.disk_hits,
+                "disk_bytes": self.cache_dir_used,
+                "renders": self.renders,
+                "render_time_avg_ms": (self.render_time * 1000 / self.renders
+                    if self.renders else 0),
+            })
+        return stats
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def icon_http_server(address, icon_server):
+    """Returns a threaded HTTP server on address, which serves icons from
+    icon_server (an IconServer) as /icon/<name>.png?size=<size>&color=<color>,
+    and its cache statistics as /stats."""
+    # Imported here, as the HTTP modules add to the startup time of every run
+    try:
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        from socketserver import ThreadingMixIn
+        from urllib.parse import urlparse, parse_qs, unquote
+    except ImportError:
+        # Python 2
+        from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+        from SocketServer import ThreadingMixIn
+        from urlparse import urlparse, parse_qs
+        from urllib import unquote
+
+    class IconRequestHandler(BaseHTTPRequestHandler):
+        """Serves icons as /icon/<name>.png?size=<size>&color=<color>, and the
+        icon server's cache statistics as /stats."""
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            icon_server = self.server.icon_server
+
+            if url.path == "/stats":
+                return self._respond(200, "application/json",
+                        json.dumps(icon_server.stats()).encode("utf-8"))
+
+            match = re.match(r"^/icon/(.+)\.png$", url.path)
+            if not match or unquote(match.group(1)) not in icon_server.icons:
+                return self._respond(404, "text/plain", b"Unknown icon\n")
+            icon = unquote(match.group(1))
+
+            try:
+                size = int(query.get("size", ["16"])[0])
+            except ValueError:
+                size = 0
+            if not 0 < size <= MAX_SERVE_SIZE:
+                return self._respond(400, "text/plain", b"Invalid size\n")
+
+            color = query.get("color", ["black"])[0]
+            try:
+                parse_color_spec(color)
+            except ValueError:
+                return self._respond(400, "text/plain", b"Invalid color\n")
+
+            # The key is derived from the request, so a matching ETag can be
+            # answered without looking up the image
+            etag = '"%s"' % icon_server.key(icon, size, color)
+            if etag in [tag.strip() for tag in
+                    self.headers.get("If-None-Match", "").split(",")]:
+                return self._respond(304, None, None, etag)
+
+            key, data = icon_server.get(icon, size, color)
+            self._respond(200, "image/png", data, etag)
+
+        def _respond(self, status, content_type, data, etag=None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "public, max-age=86400")
+            if data is not None:
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if data is not None:
+                self.wfile.write(data)
+
+
+    class IconHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+        def __init__(self, address, icon_server):
+            HTTPServer.__init__(self, address, IconRequestHandler)
+            self.icon_server = icon_server
+
+    return IconHTTPServer(address, icon_server)
+
+
+def parse_address(value):
+    """Parses a [HOST:]PORT server address."""
+    host, _, port = value.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid address: %r" % value)
+
+
+def size_list(value):
+    """Parses a comma-separated list of icon sizes."""
+    try:
+        return [int(size) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid size list: %r" % value)
+
+
+def padding_size(value):
+    """Parses a padding in pixels, which can't be negative."""
+    try:
+        pixels = int(value)
+    except ValueError:
+        pixels = -1
+    if pixels < 0:
+        raise argparse.ArgumentTypeError("invalid padding: %r" % value)
+    return pixels
+
+
+def color_list(value):
+    """Parses a comma-separated list of colors. Commas within parentheses,
+    as in "rgb(255,0,0)", don't separate colors."""
+    return [color.strip() for color in re.split(r",(?![^(]*\))", value)]
+
+
+def list_exports(selected_icons, sizes, colors, filename, font,
+        extension=".png", prefix=None):
+    """Returns the (icon, size, filename, font, color) exports of icons in
+    all the combinations of sizes and colors, named the way the command line
+    does. filename is the --filename option, if given. It's a prefix of the
+    icon names if prefix is set, or by default if more than one icon is
+    selected."""
+    exports = []
+    if prefix is None:
+        prefix = len(selected_icons) > 1
+
+    for icon in selected_icons:
+        if prefix:
+            # Exporting multiple icons -- treat the filename option as name prefix
+            icon_filename = (filename or "") + icon + extension
+        else:
+            # Exporting one icon
+            icon_filename = filename or icon + extension
+
+        # The mask of each icon is rendered once per size, and reused for
+        # all colors
+        for size in sizes:
+            for color in colors:
+                exports.append((icon, size, variant_filename(icon_filename,
+                        size, color, sizes, colors), font, color))
+
+    return exports
+
+
+def watch_exports(plan, watched, exporter, link="copy", interval=1.0,
+        polls=None):
+    """Exports icons, then watches files for changes and exports again the
+    icons which are affected.
+
+    plan is a function which returns the current (exports, icon map) tuple,
+    where exports are (icon, size, filename, font, color) tuples. It's
+    called again whenever the contents of one of the watched files change
+    (files are polled every interval seconds, and their hashes are compared
+    when their size or mtime changes).
+
+    An export is rendered again only if its icon's codepoint, the glyph (see
+    glyph_digests), the size, color or filename changed; the files of
+    exports which are no longer planned are removed. polls limits the number
+    of polls, for testing (by default, it watches until interrupted).
+    """
+    writer = FileWriter(make_dirs=True)
+    exported = {}
+    states = {}
+
+    def file_state(filename):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def update():
+        exports, icon_map = plan()
+        exporter.icons = icon_map
+
+        # Glyph digests, by font; the hash of the whole font file stands in
+        # for glyphs which can't be told apart
+        digests = {}
+        keys = {}
+        for export in exports:
+            icon, size, filename, font, color = export
+            if font not in digests:
+                digests[font] = (glyph_digests(font) or {}, file_hash(font))
+            glyphs, font_hash = digests[font]
+            char = icon_map[icon]
+            keys[filename] = render_key(glyphs.get(ord(char), font_hash),
+                    char, size, color, exporter.options_key())
+
+        for filename in sorted(set(exported) - set(keys)):
+            if path.lexists(filename):
+                os.remove(filename)
+            print("Removed %s" % filename)
+            del exported[filename]
+
+        changed = [export for export in exports
+                if exported.get(export[2]) != keys[export[2]]]
+        failed = 0
+        for group in group_exports(changed, icon_map):
+            icon, size, filename, font, color = group[0]
+            print("Exporting icon \"%s\" as %s (%ix%i pixels)" %
+                    (icon, filename, size, size))
+            for export in group[1:]:
+                print("Exporting icon \"%s\" as %s (%s of %s)" %
+                        (export[0], export[2], link, filename))
+            try:
+                export_group(group, link, exporter, writer)
+            except Exception as e:
+                sys.stderr.write("Error: Failed to export icon \"%s\" "
+                        "(%s: %s)\n" % (icon, type(e).__name__, e))
+                failed += 1
+                continue
+            for export in group:
+                exported[export[2]] = keys[export[2]]
+
+        print("Exported %i of %i icons%s" % (len(changed) - failed,
+                len(exports), ", %i failed" % failed if failed else ""))
+        sys.stdout.flush()
+
+    for filename in watched:
+        states[filename] = (file_state(filename), file_hash(filename))
+    update()
+
+    poll = 0
+    while polls is None or poll < polls:
+        time.sleep(interval)
+        poll += 1
+
+        changed = []
+        for filename in watched:
+            state, digest = states[filename]
+            new_state = file_state(filename)
+            if new_state == state or new_state is None:
+                continue
+            new_digest = file_hash(filename)
+            states[filename] = (new_state, new_digest)
+            if new_digest != digest:
+                changed.append(filename)
+
+        if changed:
+            print("Changed: %s" % ", ".join(changed))
+            try:
+                update()
+            except (SystemExit, IOError, OSError):
+                # A file which can't be read (e.g. while it's being written)
+                # is read again on its next change
+                sys.stderr.write("Error: Can't export the icons, waiting for "
+                        "the next change\n")
+
+
+def variant_filename(filename, size, color, sizes, colors):
+    """Adds the size and/or color to a filename, if more than one size or
+    color is exported."""
+    root, ext = path.splitext(filename)
+    if len(sizes) > 1:
+        root += "-%i" % size
+    if len(colors) > 1:
+        root += "-" + re.sub(r"[^0-9A-Za-z]+", "", color)
+    return root + ext
+
+
+def default_cache_dir():
+    """Returns the directory to keep cached data in, or None if caching is
+    disabled (by setting FONT_AWESOME_TO_PNG_CACHE_DIR to an empty value)."""
+    cache_dir = os.environ.get("FONT_AWESOME_TO_PNG_CACHE_DIR")
+    if cache_dir is not None:
+        return cache_dir or None
+
+    return path.join(os.environ.get("XDG_CACHE_HOME") or
+            path.join(path.expanduser("~"), ".cache"), "font-awesome-to-png")
+
+
+def write_cache_file(filename, data):
+    """Writes a cache file atomically, ignoring any errors -- a cache which
+    can't be written only makes the next run slower."""
+    tmp_filename = "%s.%i.tmp" % (filename, os.getpid())
+    try:
+        if not path.isdir(path.dirname(filename)):
+            os.makedirs(path.dirname(filename))
+        with open(tmp_filename, "wb") as f:
+            f.write(data)
+        replace_file(tmp_filename, filename)
+    except (IOError, OSError):
+        if path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+class LoadCSSAction(argparse.Action):
+    # Version of the files caching the icons parsed from CSS files
+    VERSION = 2
+
+    is_icon = re.compile(u(r"\.fa-([-\w]+):before"))
+    is_content = re.compile(r"content\s*:\s*([\"'])\\([0-9a-fA-F]+)\1")
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        global icons
+        icons = LoadCSSAction._load_css(values, default_cache_dir())
+        setattr(namespace, self.dest, values)
+
+    @staticmethod
+    def _load_css(filename, cache_dir=None):
+        """Returns the icons defined in a CSS file, cached in cache_dir if
+        given."""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            sys.stderr.write("Error: CSS file (%s) can't be opened\n"
+                % (filename))
+            exit(1)
+
+        # Icons parsed from the CSS file are cached, keyed by its path, size
+        # and modification time
+        if cache_dir:
+            cache_filename = path.join(cache_dir, "css-%s.json" %
+                    hashlib.sha1(path.abspath(filename).encode("utf-8"))
+                    .hexdigest())
+            cache_key = [path.abspath(filename), stat.st_size, stat.st_mtime]
+
+            try:
+                with open(cache_filename, "rb") as f:
+                    cached = json.loads(f.read().decode("utf-8"))
+                if cached["version"] == LoadCSSAction.VERSION and \
+                        cached["key"] == cache_key:
+                    return dict((name, uchr(code))
+                            for name, code in cached["icons"])
+            except (IOError, ValueError, KeyError, TypeError):
+                pass
+
+        try:
+            with io.open(filename, encoding="utf-8") as f:
+                try:
+                    import tinycss
+                except ImportError:
+                    new_icons = LoadCSSAction._parse_css_stream(f)
+                else:
+                    new_icons = LoadCSSAction._parse_css_tinycss(f.read())
+        except IOError:
+            sys.stderr.write("Error: CSS file (%s) can't be opened\n"
+                % (filename))
+            exit(1)
+
+        if cache_dir:
+            write_cache_file(cache_filename, json.dumps({
+                "version": LoadCSSAction.VERSION,
+                "key": cache_key,
+                "icons": sorted((name, ord(char))
+                    for name, char in new_icons.items()),
+            }, separators=(",", ":")).encode("utf-8"))
+
+        return new_icons
+
+    @staticmethod
+    def _parse_css_tinycss(css):
+        import tinycss
+        new_icons = {}
+        parser = tinycss.make_parser("page3")
+
+        stylesheet = parser.parse_stylesheet(css)
+
+        # The rules nested in at-rules like @media count too, as they do
+        # for _parse_css_stream; other at-rules, like @page, are skipped
+        def rulesets(rules):
+            for rule in rules:
+                if hasattr(rule, "rules"):
+                    for nested in rulesets(rule.rules):
+                        yield nested
+                elif isinstance(rule, tinycss.css21.RuleSet):
+                    yield rule
+
+        for rule in rulesets(stylesheet.rules):
+            selector = rule.selector.as_css()
+            for match in LoadCSSAction.is_icon.finditer(selector):
+                name = match.groups()[0]
+                for declaration in rule.declarations:
+                    if declaration.name == u"content":
+                        val = declaration.value.as_css()
+                        if val[:1] in "\"'" and val.endswith(val[:1]):
+                            val = val[1:-1]
+                        new_icons[name] = uchr(int(val[1:], 16))
+        return new_icons
+
+    @staticmethod
+    def _parse_css_stream(f):
+        """Parses icons from a CSS file without tinycss, reading it in chunks
+        and looking only at the selectors and content declarations."""
+        new_icons = {}
+        comment = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+        buf = u""
+        selector = None
+        for chunk in iter(lambda: f.read(65536), u""):
+            buf += chunk
+
+            # Only split the text up to the last brace, the rest may be an
+            # incomplete rule
+            last = max(buf.rfind(u"{"), buf.rfind(u"}"))
+            if last < 0:
+                continue
+            tokens = re.split(u"([{}])", comment.sub(u"", buf[:last + 1]))
+            buf = buf[last + 1:]
+
+            # Tokens alternate between text and braces; the text before an
+            # opening brace is a selector, the text before a closing brace
+            # which follows it is that selector's declarations
+            for text, brace in zip(tokens[::2], tokens[1::2]):
+                if brace == u"{":
+                    selector = text
+                elif selector is not None:
+                    content = LoadCSSAction.is_content.search(text)
+                    if content:
+                        for match in LoadCSSAction.is_icon.finditer(selector):
+                            new_icons[match.group(1)] = uchr(
+                                    int(content.group(2), 16))
+                    selector = None
+        return new_icons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description="Exports Font Awesome icons as PNG images.")
+
+    parser.add_argument("icon", type=str, nargs="*",
+            help="The name(s) of the icon(s) to export (or \"ALL\" for all icons)")
+    parser.add_argument("--color", type=color_list, action="append",
+            help="Color (HTML color code or name, default: black), or a " +
+            "vertical gradient given as TOP:BOTTOM colors. Several " +
+            "colors can be given as a comma-separated list, or by " +
+            "repeating the option.")
+    parser.add_argument("--filename", type=str,
+            help="The name of the output file (it must end with \".png\"). If " +
+            "all files are exported, it is used as a prefix.")
+    parser.add_argument("--font", type=str, default="fontawesome-webfont.ttf",
+            help="Font file to use (default: fontawesome-webfont.ttf)")
+    parser.add_argument("--css", type=str, default="", action=LoadCSSAction,
+            help="Path to the CSS file defining icon names (instead of the " +
+            "predefined list)")
+    parser.add_argument("--list", nargs=0, action=ListAction,
+            help="List available icon names and exit")
+    parser.add_argument("--list-update", nargs=0, action=ListUpdateAction,
+            help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=size_list, action="append",
+            help="Icon size in pixels (default: 16). Several sizes can be " +
+            "given as a comma-separated list, or by repeating the option.")
+    parser.add_argument("--format", choices=["png", "svg"], default="png",
+            help="Format of the exported icons (default: png). SVG icons " +
+            "are drawn from the glyph outlines, in a single size")
+    parser.add_argument("--sprite", type=str,
+            help="Pack the icons into a single sprite image with the given " +
+            "name, instead of exporting them as separate files")
+    parser.add_argument("--sprite-index", type=str,
+            help="Name of the file to write icon positions within the " +
+            "sprite to (\".json\" or \".css\", default: the sprite name " +
+            "with a \".json\" extension)")
+    parser.add_argument("--sprite-padding", type=padding_size, default=1,
+            help="Space between icons in the sprite, in pixels (default: 1)")
+    parser.add_argument("--incremental", action="store_true",
+            help="Skip icons which haven't changed since the previous " +
+            "export (tracked in a %s file in the output directory)"
+            % Manifest.FILENAME)
+    parser.add_argument("--link", choices=["copy", "hardlink", "symlink"],
+            default="copy",
+            help="How to create the files of icon aliases which share a " +
+            "glyph with another exported icon (default: copy)")
+    parser.add_argument("--serve", type=parse_address, metavar="[HOST:]PORT",
+            help="Serve icons over HTTP instead of exporting them, as " +
+            "/icon/<name>.png?size=<size>&color=<color> (the host " +
+            "defaults to 127.0.0.1)")
+    parser.add_argument("--serve-cache-size", type=int, default=1024,
+            help="Number of rendered icons the server keeps in memory " +
+            "(default: 1024)")
+    parser.add_argument("--serve-cache-dir", type=str,
+            help="Directory in which the server keeps rendered icons, in " +
+            "addition to memory")
+    parser.add_argument("--serve-cache-dir-size", type=int, default=256,
+            metavar="MB",
+            help="Maximum size of the icons kept in --serve-cache-dir, " +
+            "the least recently used are removed beyond it (default: 256)")
+    parser.add_argument("--compress-level", type=int, choices=range(10),
+            metavar="LEVEL",
+            help="PNG compression level, from 0 (none, fastest) to 9 " +
+            "(best, slowest; default: 6)")
+    parser.add_argument("--optimize", action="store_true",
+            help="Let the PNG encoder make the files as small as possible, " +
+            "at the cost of encoding time")
+    parser.add_argument("--reduce-colors", action="store_true",
+            help="Save icons as grayscale (for gray colors) or palette " +
+            "images instead of RGBA where that makes them smaller, " +
+            "keeping the transparency intact")
+    parser.add_argument("--supersample", type=float, metavar="FACTOR",
+            help="Rasterize each icon once, at the largest size times " +
+            "FACTOR (e.g. 1 or 2), and downscale it to the other sizes")
+    parser.add_argument("--mask-cache-size", type=int, default=64,
+            metavar="MB",
+            help="Maximum size of the rendered icon masks kept on disk, " +
+            "reused by later runs (default: 64), or 0 to keep none")
+    parser.add_argument("--shadow", type=parse_shadow,
+            metavar="DX,DY[,BLUR[,COLOR]]",
+            help="Draw a drop shadow under the icons, offset by DX,DY " +
+            "pixels and blurred with a BLUR pixel radius (default: 0), in " +
+            "COLOR (default: #00000080)")
+    parser.add_argument("--encode-report", action="store_true",
+            help="Print the encoded size and encoding time of each icon")
+    parser.add_argument("--archive", type=str,
+            help="Write the icons into a zip or tar archive with the given " +
+            "name (\"-\" for the standard output) instead of separate " +
+            "files. --filename is used as a prefix within the archive.")
+    parser.add_argument("--archive-format",
+            choices=["zip", "tar", "tar.gz", "tar.bz2"],
+            help="Format of the archive (default: guessed from its name, " +
+            "tar for the standard output)")
+    parser.add_argument("--jobs", type=int, default=1,
+            help="Number of worker processes to export icons with " +
+            "(default: 1)")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+            help="Keep the image buffers and cached masks within about MB " +
+            "megabytes: icons are rendered, encoded and written by a " +
+            "pipeline of threads, which reuses image buffers and waits for " +
+            "earlier icons to be written when the budget is used up. The " +
+            "process also needs memory for Python, the font and the glyph " +
+            "being rasterized, and an icon larger than the budget is " +
+            "still exported, one at a time")
+    parser.add_argument("--encode-threads", type=int, default=0,
+            metavar="N",
+            help="Encode icons with N threads and write them with another, " +
+            "while the next icons are rendered (default: 0, render, encode " +
+            "and write one icon after another; 2 with --max-memory)")
+    parser.add_argument("--fsync-batch", type=int, default=0, metavar="N",
+            help="Flush the written files to disk in batches of N files, " +
+            "and once more at the end (default: 0, leave it to the system)")
+    parser.add_argument("--jobs-file", type=str, metavar="FILE",
+            help="Export the icons described by the lines of FILE (\"-\" " +
+            "for the standard input) instead, as they're read. Each line is " +
+            "a JSON object with \"icon\", \"size\", \"color\" and " +
+            "\"output\" keys, or comma-separated values in that order. The " +
+            "result of each job is printed as a line of JSON.")
+    parser.add_argument("--stdin", action="store_true",
+            help="Read the jobs from the standard input, the same as " +
+            "--jobs-file -")
+    parser.add_argument("--watch", action="store_true",
+            help="Keep running, and whenever the font, the CSS file or the " +
+            "jobs file changes, export again the icons which changed and " +
+            "remove the files of icons which were removed")
+    parser.add_argument("--watch-interval", type=float, default=1.0,
+            metavar="SECONDS",
+            help="How often --watch checks the files (default: 1 second)")
+    parser.add_argument("--metrics", type=str, metavar="FILE",
+            help="Write the metrics of the icons' glyphs (advance width and " +
+            "bounding box, in em units) to FILE as JSON, instead of " +
+            "exporting them")
+    parser.add_argument("--missing-glyphs", choices=["warn", "skip", "error"],
+            default="warn",
+            help="What to do with icons which have no glyph in the font, or " +
+            "an empty one: print a warning and export them anyway " +
+            "(default), skip them, or stop before exporting anything")
+    parser.add_argument("--check-glyphs", action="store_true",
+            help="Only check that the font has a glyph for each icon, and " +
+            "exit with an error if it doesn't")
+    parser.add_argument("--stats", action="store_true",
+            help="Print the time and net block delta (change in the " +
+            "number of allocated memory blocks) of each stage of " +
+            "exporting (font loading, drawing, bounding box, compositing, " +
+            "encoding and writing), and the slowest icons")
+    parser.add_argument("--stats-json", type=str, metavar="FILE",
+            help="Write the statistics of --stats to FILE as JSON")
+    parser.add_argument("--profile", type=str, metavar="FILE",
+            help="Run under cProfile and save the profile to FILE (see the " +
+            "pstats module)")
+
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(run, parser, args)
+        finally:
+            profiler.dump_stats(args.profile)
+    return run(parser, args)
+
+
+def run(parser, args):
+    """Runs the program with the parsed command line arguments."""
+    icon = args.icon
+    font = args.font
+
+    # Sizes and colors, in the order given, without duplicates
+    sizes = list(OrderedDict.fromkeys(
+            sum(args.size or [], []) or [16]))
+    colors = list(OrderedDict.fromkeys(
+            sum(args.color or [], []) or ["black"]))
+
+    if args.font:
+        if not path.isfile(args.font) or not access(args.font, R_OK):
+            sys.stderr.write("Error: Font file (%s) can't be opened\n"
+                    % (args.font))
+            exit(1)
+
+    options = {"compress_level": args.compress_level,
+            "optimize": args.optimize, "reduce_colors": args.reduce_colors,
+            "shadow": args.shadow}
+    if len([color for color in colors if ":" in color]) > 1:
+        options["batch_colors"] = colors
+    if args.supersample:
+        options["supersample_size"] = int(round(max(sizes) *
+                args.supersample))
+    cache_dir = default_cache_dir()
+    if cache_dir:
+        options["cache_dir"] = cache_dir
+    if args.mask_cache_size > 0 and cache_dir:
+        options["mask_store"] = MaskStore(path.join(cache_dir, "masks"),
+                args.mask_cache_size * 1024 * 1024)
+    if args.format == "svg" and (args.serve or args.watch or
+            args.jobs_file or args.stdin):
+        parser.error("--format svg can't be used with --serve, --watch, " +
+                "--jobs-file or --stdin")
+
+    stats = ExportStats() if args.stats or args.stats_json else None
+    exporter = Exporter(font, load_icons(), font_cache, mask_cache,
+            stats=stats, **options)
+
+    # Half of the memory limit goes to the images in progress, the rest to
+    # the cached masks and batches of recolored images
+    pool = None
+    if args.max_memory:
+        if args.serve or (args.jobs > 1 and not args.jobs_file and
+                not args.stdin):
+            parser.error("--max-memory can't be used with --serve, or with " +
+                    "--jobs unless jobs are read from a file")
+        max_bytes = args.max_memory * 1024 * 1024
+        pool = CanvasPool(max_bytes // 2)
+        mask_cache.max_bytes = max_bytes // 4
+        exporter.BATCH_BYTES = min(Exporter.BATCH_BYTES, max_bytes // 4)
+
+    if args.serve:
+        icon_server = IconServer(font, load_icons(), args.serve_cache_size,
+                args.serve_cache_dir, max(args.jobs, 4), options,
+                args.serve_cache_dir_size * 1024 * 1024)
+        server = icon_http_server(args.serve, icon_server)
+
+        print("Serving icons on http://%s:%i/" % server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            icon_server.close()
+            print("Cache statistics: %s" % json.dumps(icon_server.stats()))
+        return
+
+    if args.stdin:
+        args.jobs_file = "-"
+
+    if args.watch:
+        if args.sprite or args.archive or args.incremental:
+            parser.error("--watch can't be used with --sprite, --archive " +
+                    "or --incremental")
+        if args.jobs_file == "-":
+            parser.error("--watch can't be used with --stdin")
+        if not args.icon and not args.jobs_file:
+            parser.error("the icon argument is required")
+
+        def plan():
+            icon_map = LoadCSSAction._load_css(args.css, cache_dir) \
+                    if args.css else load_icons()
+
+            if args.jobs_file:
+                defaults = {"size": sizes[0], "color": colors[0],
+                        "prefix": args.filename or ""}
+                exports = []
+                with io.open(args.jobs_file, encoding="utf-8") as f:
+                    for number, line in enumerate(f, 1):
+                        if not line.strip() or line.lstrip().startswith("#"):
+                            continue
+                        try:
+                            job = parse_job(line, defaults)
+                        except ValueError as e:
+                            sys.stderr.write("Error: Invalid job on line %i "
+                                    "(%s)\n" % (number, e))
+                            continue
+                        if job["icon"] not in icon_map:
+                            sys.stderr.write("Error: Unknown icon name (%s) "
+                                    "on line %i\n" % (job["icon"], number))
+                            continue
+                        exports.append((job["icon"], job["size"],
+                                job["output"], font, job["color"]))
+                return exports, icon_map
+
+            if args.icon == ["ALL"]:
+                selected = sorted(icon_map.keys())
+            else:
+                selected = []
+                for name in args.icon:
+                    if name.startswith("icon-"):
+                        name = name[5:]
+                    if name in icon_map:
+                        selected.append(name)
+                    else:
+                        sys.stderr.write("Error: Unknown icon name (%s)\n"
+                                % name)
+            return list_exports(selected, sizes, colors, args.filename,
+                    font), icon_map
+
+        watched = [font] + [filename for filename in (args.css,
+                args.jobs_file) if filename]
+        print("Watching %s" % ", ".join(watched))
+        try:
+            watch_exports(plan, watched, exporter, args.link,
+                    args.watch_interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.jobs_file:
+        if args.icon:
+            parser.error("icons can't be given with --jobs-file or --stdin")
+        if args.sprite or args.incremental:
+            parser.error("--jobs-file and --stdin can't be used with " +
+                    "--sprite or --incremental")
+
+        if args.archive:
+            writer = ArchiveWriter(args.archive, args.archive_format)
+        else:
+            writer = FileWriter(make_dirs=True, sync_batch=args.fsync_batch)
+
+        # The results are printed to the standard output, unless it carries
+        # the archive
+        out = sys.stderr if args.archive == "-" else sys.stdout
+        defaults = {"size": sizes[0], "color": colors[0],
+                "prefix": args.filename or ""}
+
+        if args.jobs_file == "-":
+            lines = sys.stdin
+        else:
+            try:
+                lines = io.open(args.jobs_file, encoding="utf-8")
+            except IOError:
+                sys.stderr.write("Error: Jobs file (%s) can't be opened\n"
+                        % args.jobs_file)
+                sys.exit(1)
+
+        try:
+            count, failed = export_stream(lines, exporter, writer, out,
+                    defaults, threads=args.encode_threads or max(args.jobs, 2),
+                    pool=pool)
+        finally:
+            writer.close()
+
+        # Keep the standard output for the results
+        sys.stdout = sys.stderr
+        failed += report_write_errors(writer)
+        print_stats(stats, args.stats, args.stats_json)
+
+        if failed:
+            sys.stderr.write("Error: %i of %i jobs failed\n" % (failed, count))
+            sys.exit(1)
+        return
+
+    if not args.icon:
+        parser.error("the icon argument is required")
+
+    if args.icon == [ "ALL" ]:
+        # Export all icons
+        selected_icons = sorted(load_icons().keys())
+    else:
+        selected_icons = []
+
+        # Icon name was given
+        for icon in args.icon:
+            # Strip the "icon-" prefix, if present
+            if icon.startswith("icon-"):
+                icon = icon[5:]
+
+            if icon in load_icons():
+                selected_icons.append(icon)
+            else:
+                sys.stderr.write("Error: Unknown icon name (%s)\n" % (icon))
+                sys.exit(1)
+
+    # --filename is a prefix if several icons were asked for, even if some
+    # of them are skipped below
+    filename_prefix = len(selected_icons) > 1
+
+    # Check the glyphs of the icons before rendering any of them
+    coverage = glyph_coverage(font, load_icons(), selected_icons, cache_dir)
+    if coverage is None:
+        if args.check_glyphs:
+            sys.stderr.write("Error: The glyphs of the font (%s) can't be "
+                    "checked\n" % font)
+            sys.exit(1)
+        if args.missing_glyphs != "warn":
+            sys.stderr.write("Warning: The glyphs of the font (%s) can't be "
+                    "checked\n" % font)
+    else:
+        missing, empty = coverage
+        action = "error" if args.check_glyphs else args.missing_glyphs
+        for problem, icons in (("no glyph", missing),
+                ("an empty glyph", empty)):
+            if icons:
+                sys.stderr.write("%s: %i of %i icons have %s in the font "
+                        "(%s): %s\n" % ("Error" if action == "error" else
+                        "Warning", len(icons), len(selected_icons), problem,
+                        font, ", ".join(icons)))
+        if action == "error" and (missing or empty):
+            sys.exit(1)
+        if action == "skip":
+            skipped = set(missing + empty)
+            selected_icons = [icon for icon in selected_icons
+                    if icon not in skipped]
+            if skipped:
+                sys.stderr.write("Skipping %i icons\n" % len(skipped))
+
+    if args.check_glyphs:
+        print("All %i icons have glyphs in the font" % len(selected_icons))
+        return
+
+    if args.metrics:
+        metrics = GlyphMetrics.load(font, cache_dir)
+        if metrics is None:
+            sys.stderr.write("Error: Glyph metrics of the font (%s) can't be "
+                    "read\n" % font)
+            sys.exit(1)
+
+        entries = OrderedDict()
+        for icon in selected_icons:
+            advance, bbox = metrics.glyphs.get(ord(load_icons()[icon]),
+                    (None, None))
+            entries[icon] = OrderedDict([
+                ("codepoint", "%x" % ord(load_icons()[icon])),
+                ("advance", advance),
+                ("bbox", bbox),
+            ])
+
+        with open(args.metrics, "w") as f:
+            json.dump(OrderedDict([
+                ("ascender", metrics.ascender),
+                ("descender", metrics.descender),
+                ("icons", entries),
+            ]), f, indent=2)
+            f.write("\n")
+
+        print("Wrote metrics of %i icons to %s" % (len(entries), args.metrics))
+        return
+
+    if args.sprite and args.incremental:
+        parser.error("--incremental can't be used with --sprite")
+    if args.archive and (args.sprite or args.incremental):
+        parser.error("--archive can't be used with --sprite or --incremental")
+
+    if args.format == "svg":
+        if args.incremental or args.shadow:
+            parser.error("--format svg can't be used with --incremental or " +
+                    "--shadow")
+        try:
+            GlyphOutlines.load(font)
+        except (IOError, ValueError) as e:
+            sys.stderr.write("Error: Glyph outlines of the font (%s) can't be "
+                    "read (%s)\n" % (font, e))
+            sys.exit(1)
+
+        if args.sprite:
+            data_size = export_svg_sprite(selected_icons, args.sprite, exporter)
+            print("Exported %i icons as SVG sprite %s (%i bytes)" %
+                    (len(selected_icons), args.sprite, data_size))
+            return
+
+        # The outlines are the same in every size
+        exports = list_exports(selected_icons, sizes[:1], colors,
+                args.filename, font, ".svg", filename_prefix)
+        writer = ArchiveWriter(args.archive, args.archive_format) \
+                if args.archive else FileWriter()
+        if args.archive == "-":
+            sys.stdout = sys.stderr
+        for icon, size, filename, font, color in exports:
+            print("Exporting icon \"%s\" as %s" % (icon, filename))
+            writer.write(filename, exporter.render_svg(icon, color))
+        writer.close()
+        return
+
+    if args.sprite:
+        index_filename = (args.sprite_index or
+                path.splitext(args.sprite)[0] + ".json")
+
+        variants = [(variant_filename(icon, size, color, sizes, colors),
+                icon, size, color)
+                for icon in selected_icons
+                for size in sizes
+                for color in colors]
+
+        print("Exporting %i icons as sprite %s, index %s" %
+                (len(variants), args.sprite, index_filename))
+
+        sprite = export_sprite(variants, args.sprite, index_filename, exporter,
+                args.sprite_padding)
+
+        print("Sprite size: %ix%i pixels" % sprite.size)
+        print_stats(stats, args.stats, args.stats_json)
+        return
+
+    exports = list_exports(selected_icons, sizes, colors, args.filename, font,
+            prefix=filename_prefix)
+
+    if args.incremental:
+        manifest = Manifest(path.join(path.dirname(args.filename or ""),
+                Manifest.FILENAME))
+        font_hash = file_hash(font)
+        options_key = exporter.options_key()
+
+        # The files of aliases are linked to the first file of their group,
+        # so how is part of their key, and a group is exported again as a
+        # whole if any of its files is out of date
+        groups = group_exports(exports)
+        aliases = set(export[2] for group in groups for export in group[1:])
+        keys = dict(((export[2], render_key(font_hash,
+                load_icons()[export[0]], export[1], export[4],
+                (options_key, args.link) if export[2] in aliases
+                else options_key))
+                for export in exports))
+
+        total = len(exports)
+        exports = [export for group in groups
+                if not all(manifest.is_current(export[2], keys[export[2]])
+                    for export in group)
+                for export in group]
+        print("Skipping %i of %i icons which are up to date" %
+                (total - len(exports), total))
+
+    # Aliases sharing a codepoint are rendered only once
+    groups = group_exports(exports)
+
+    def print_group(group, verb):
+        icon, size, filename, font, color = group[0]
+        print("%s icon \"%s\" as %s (%ix%i pixels)" %
+                (verb, icon, filename, size, size))
+        for export in group[1:]:
+            print("%s icon \"%s\" as %s (%s of %s)" %
+                    (verb, export[0], export[2], args.link, filename))
+
+    # (filename, size in bytes, encoding time) of each rendered image
+    encode_report = []
+
+    if args.archive:
+        writer = ArchiveWriter(args.archive, args.archive_format)
+        if args.archive == "-":
+            # The standard output carries the archive, print messages to the
+            # standard error instead
+            sys.stdout = sys.stderr
+    else:
+        writer = FileWriter(sync_batch=args.fsync_batch)
+
+    def report_failure(group, error):
+        for export in group:
+            sys.stderr.write("Error: Failed to export icon \"%s\" (%s)\n" %
+                    (export[0], error))
+        return len(group)
+
+    # Files are written as each icon is exported, but only flushed to disk
+    # when the writer is closed, so they're added to the manifest after that
+    exported = []
+    failed = 0
+
+    pipelined = args.max_memory or args.encode_threads > 0
+    serial = not pipelined and (args.jobs <= 1 or len(groups) <= 1)
+    if not serial:
+        if pipelined:
+            results = export_pipeline(groups, exporter, writer, args.link,
+                    pool, args.encode_threads or 2)
+        else:
+            results = export_icons_parallel(groups, args.jobs, font, sizes,
+                    args.link, options, buffered=bool(args.archive),
+                    stats=stats is not None, sync_batch=args.fsync_batch)
+
+        for group, error, encoded, buffer, stages in results:
+            if stages:
+                stats.add(group[0][2], stages)
+
+            if error:
+                failed += report_failure(group, error)
+            else:
+                print_group(group, "Exported")
+                encode_report.append((group[0][2],) + encoded)
+                exported.extend(group)
+
+                if buffer:
+                    buffer.replay(writer)
+    else:
+        for group in groups:
+            print_group(group, "Exporting")
+
+            try:
+                encoded = export_group(group, args.link, exporter, writer)
+            except Exception as e:
+                failed += report_failure(group,
+                        "%s: %s" % (type(e).__name__, e))
+                continue
+            encode_report.append((group[0][2],) + encoded)
+            exported.extend(group)
+
+    writer.close()
+    failed += report_write_errors(writer)
+
+    if args.incremental:
+        unwritten = set(filename for filename, error in
+                getattr(writer, "errors", []))
+        for export in exported:
+            if export[2] not in unwritten:
+                manifest.update(export[2], keys[export[2]])
+        manifest.save()
+
+    if failed:
+        sys.stderr.write("Error: %i of %i icons failed to export\n"
+                % (failed, len(exports)))
+        sys.exit(1)
+
+    if serial and len(exports) > 1:
+        print("Font cache: %(hits)i hits, %(misses)i misses" %
+                font_cache.stats())
+        print("Mask cache: %(hits)i hits, %(misses)i misses" %
+                mask_cache.stats())
+        if exporter.mask_store:
+            print("Mask store: %(hits)i hits, %(misses)i misses" %
+                    exporter.mask_store.stats())
+
+    if len(groups) < len(exports):
+        print("Rendered %i images for %i icons, %i aliases reused" %
+                (len(groups), len(exports), len(exports) - len(groups)))
+
+    if args.encode_report and encode_report:
+        for filename, encoded_size, elapsed in encode_report:
+            print("Encoded %s: %i bytes in %.2f ms" %
+                    (filename, encoded_size, elapsed * 1000))
+        print("Encoded %i images: %i bytes in %.2f ms" % (len(encode_report),
+                sum(report[1] for report in encode_report),
+                sum(report[2] for report in encode_report) * 1000))
+
+    print_stats(stats, args.stats, args.stats_json)
+
+
+def report_write_errors(writer):
+    """Prints the files which a writer failed to flush to disk (see
+    FileWriter.sync), and returns their number."""
+    errors = getattr(writer, "errors", [])
+    for filename, error in errors:
+        sys.stderr.write("Error: Failed to write %s (%s)\n" % (filename, error))
+    return len(errors)
+
+
+def print_stats(stats, text, json_filename):
+    """Prints the report of an ExportStats and/or saves it as JSON."""
+    if stats is None:
+        return
+    stats.stop()
+    if text:
+        print(stats.format_report())
+    if json_filename:
+        with open(json_filename, "w") as f:
+            json.dump(stats.report(slowest=len(stats.images)), f, indent=2)
+            f.write("\n")
+
+
+if __name__ == '__main__':
+    main()